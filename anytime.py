@@ -0,0 +1,202 @@
+import argparse
+import sys
+import time
+import numpy as np
+import batch_update
+from d_star_lite import DStarLite
+from occupancy_grid import OccupancyGridMap, make_world
+from priority_queue import key_less
+
+class AnytimeDStarLite(DStarLite):
+    # Anytime D* on top of D* Lite: overconsistent cells are keyed with an inflated heuristic, so a search
+    # settles far fewer cells and returns a path at most epsilon times the optimal cost. Each search runs
+    # within a budget of expansions and/or milliseconds and resumes on the next call if it ran out. Once a
+    # search completes, the next call lowers epsilon, requeues the cells that became inconsistent after being
+    # closed (INCONS) and keeps tightening from the same g/rhs until epsilon reaches epsilon_min.
+    def __init__(self, map, s_start, s_goal, epsilon=2.5, epsilon_step=0.5, epsilon_min=1.0, max_expansions=None,
+                 budget_ms=None, **kwargs):
+        self.epsilon = epsilon
+        self.epsilon_step = epsilon_step
+        self.epsilon_min = epsilon_min
+        self.max_expansions = max_expansions
+        self.budget_ms = budget_ms
+        self.closed = set()
+        self.incons = set()
+        self.complete = False
+        super().__init__(map, s_start, s_goal, **kwargs)
+
+    @property
+    def bound(self):
+        # Suboptimality factor of the current g field, or None while a search is still unfinished.
+        return self.epsilon if self.complete else None
+
+    def key(self, u):
+        g = self.g_flat[u]
+        rhs = self.rhs_flat[u]
+        h = self.heuristic(self.s_start, divmod(u, self.table.y_dim))
+        if g > rhs:
+            return (rhs + self.epsilon * h + self.k_m, rhs)
+        return (g + h + self.k_m, g)
+
+    def update_index(self, u):
+        super().update_index(u)
+        if self.g_flat[u] > self.rhs_flat[u] and u in self.closed:
+            # Closed cells are not lowered twice in one search; they wait for the next epsilon.
+            self.open_list.remove(u)
+            self.incons.add(u)
+        else:
+            # Underconsistent cells stay in OPEN even when closed: their too low g must be raised in this
+            # search, or it can hold up a path whose cost has since gone up.
+            self.incons.discard(u)
+
+    def update_vertices(self, cells):
+        # The batched version keys cells without the inflation and knows nothing of CLOSED.
+        cells = batch_update.as_cells(cells)
+        xs, ys = cells[:, 0], cells[:, 1]
+        self.table.refresh(self.map.grid, xs, ys)
+        indices = (xs * self.table.y_dim + ys).tolist()
+        self.path_cache.touch(indices)
+        for u in indices:
+            self.update_index(u)
+        return len(cells)
+
+    def reset_epsilon(self, epsilon):
+        # E.g. after a large map change, to get a quick path again instead of a slow tight one.
+        self.epsilon = epsilon
+        self.open_list.rekey(self.key)
+
+    def requeue(self):
+        for u in self.incons:
+            self.open_list.put(u, self.key(u))
+        self.incons.clear()
+        self.closed.clear()
+        self.open_list.rekey(self.key)
+
+    def tighten(self):
+        self.epsilon = max(self.epsilon_min, self.epsilon - self.epsilon_step)
+        self.requeue()
+        self.complete = False
+
+    def compute_shortest_path(self, return_path=True, max_expansions=None, budget_ms=None):
+        if max_expansions is None:
+            max_expansions = self.max_expansions
+        if budget_ms is None:
+            budget_ms = self.budget_ms
+        if self.complete:
+            # Every call after a finished search starts a new one, also at epsilon_min: map changes since then
+            # may have left closed cells inconsistent in INCONS.
+            self.tighten()
+        timer_start = time.perf_counter()
+        deadline = timer_start + budget_ms / 1000 if budget_ms is not None else timer_start + self.timeout
+        iterations = 0
+        stale_pops = 0
+        on_expand = self.on_expand
+        prepare = getattr(self.heuristic, 'prepare', None)
+        if prepare is not None:
+            prepare()
+        heuristic_version = getattr(self.heuristic, 'version', None)
+        if heuristic_version != self.heuristic_version:
+            self.open_list.rekey(self.key)
+            self.heuristic_version = heuristic_version
+        table = self.table
+        g = self.g_flat
+        rhs = self.rhs_flat
+        open_list = self.open_list
+        changed = self.path_cache.dirty if self.path_cache.cells is not None else None
+        start = table.index(self.s_start)
+        self.complete = False
+        while True:
+            if open_list.empty() or not (key_less(open_list.top_key(), self.key(start)) or rhs[start] != g[start]):
+                if self.incons and rhs[start] != g[start]:
+                    # Nothing left to expand while s_start itself waits in INCONS.
+                    self.requeue()
+                    continue
+                self.complete = True
+                break
+            if max_expansions is not None and iterations - stale_pops >= max_expansions:
+                break
+            if time.perf_counter() > deadline:
+                break
+            iterations += 1
+            k_old, u = open_list.pop()
+            k_new = self.key(u)
+            if k_old < k_new:
+                stale_pops += 1
+                self.stats.heap_pushes += 1
+                open_list.put(u, k_new)
+                continue
+            self.visited_nodes.add_index(u)
+            if changed is not None:
+                changed.append(u)
+            if on_expand is not None:
+                on_expand(table.cell(u))
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                self.closed.add(u)
+                for s in table.neighbors(u):
+                    self.update_index(s)
+            else:
+                # Raising g undoes the closing, so the cell may be lowered again in this search.
+                self.closed.discard(u)
+                g[u] = np.inf
+                for s in table.neighbors(u) + [u]:
+                    self.update_index(s)
+        stats = self.stats
+        stats.expansions += iterations - stale_pops
+        stats.stale_pops += stale_pops
+        stats.replans += 1
+        stats.record_time('compute_shortest_path', time.perf_counter() - timer_start)
+        if self.on_replan is not None:
+            self.on_replan(self)
+        return self.extract_path() if return_path else None
+
+def check_bound(runs=300, grid_size=30, density=0.2, changes=10, steps=10, connectivity=8, first_seed=0):
+    # Regression check for the bound: after every completed search at epsilon_min on a changing map, g(s_start)
+    # must equal what a fresh DStarLite finds. Returns (checks, failures), failures as (seed, step, g, optimal).
+    checks = 0
+    failures = []
+    costs = np.array([-1, 0, 3, 7])
+    for seed in range(first_seed, first_seed + runs):
+        map, start, goal, rng = make_world(grid_size, density, seed)
+        planner = AnytimeDStarLite(map=map, s_start=start, s_goal=goal, headless=True, random_obstacles=False,
+                                   connectivity=connectivity)
+        for step in range(steps):
+            planner.compute_shortest_path(return_path=False)
+            while planner.bound != planner.epsilon_min:
+                planner.compute_shortest_path(return_path=False)
+            fresh = DStarLite(map=OccupancyGridMap(grid_size, grid_size, grid=np.array(map.grid)), s_start=start,
+                              s_goal=goal, headless=True, random_obstacles=False, connectivity=connectivity)
+            fresh.compute_shortest_path(return_path=False)
+            checks += 1
+            found, optimal = float(planner.g[start]), float(fresh.g[start])
+            if not (found == optimal or abs(found - optimal) < 1e-6):
+                failures.append((seed, step, found, optimal))
+                break
+            cells = [tuple(int(v) for v in cell) for cell in rng.integers(0, grid_size, (changes, 2))]
+            planner.apply_changes([(cell, costs[rng.integers(len(costs))]) for cell in cells if cell not in (start, goal)],
+                                  replan=False)
+    return checks, failures
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check that AnytimeDStarLite reaches the optimal cost at epsilon_min on changing maps.")
+    parser.add_argument('--runs', type=int, default=300)
+    parser.add_argument('--size', type=int, default=30)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--changes', type=int, default=10, help="random cost changes between searches")
+    parser.add_argument('--steps', type=int, default=10, help="searches per run")
+    parser.add_argument('--connectivity', type=int, choices=[4, 8], default=8)
+    parser.add_argument('--first-seed', type=int, default=0)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    checks, failures = check_bound(args.runs, args.size, args.density, args.changes, args.steps, args.connectivity,
+                                   args.first_seed)
+    for seed, step, found, optimal in failures:
+        print(f"seed {seed} search {step}: g(s_start) {found} at epsilon_min, "
+              f"optimal {optimal}", file=sys.stderr)
+    print(f"{checks} checks, {len(failures)} failures", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import numpy as np
+from grid_graph import STRAIGHT_OFFSETS, neighbor_offsets, edge_costs
+
+def as_cells(cells):
+    cells = np.asarray(cells, dtype=np.intp).reshape(-1, 2)
+    if len(cells) > 1:
+        cells = np.unique(cells, axis=0)
+    return cells
+
+def compute_rhs(g, grid, xs, ys, connectivity=4):
+    rhs = np.full(len(xs), np.inf, dtype=g.dtype)
+    for dx, dy in neighbor_offsets(connectivity):
+        costs, nx, ny = edge_costs(grid, xs, ys, dx, dy)
+        np.minimum(rhs, g[nx, ny] + costs, out=rhs)
+    rhs[grid[xs, ys] == -1] = np.inf
+    return rhs
+
+def update_vertices(planner, cells):
+    # Batched update_vertex: rhs for all cells in one pass, then only inconsistent cells are (re)queued.
+    cells = as_cells(cells)
+    if len(cells) == 0:
+        return 0
+    xs, ys = cells[:, 0], cells[:, 1]
+    # update_vertices sees every cell whose outgoing edges may have changed, so their table rows are refreshed here.
+    planner.table.refresh(planner.map.grid, xs, ys)
+    indices = xs * planner.table.y_dim + ys
+    planner.path_cache.touch(indices.tolist())
+    not_goal = (xs != planner.s_goal[0]) | (ys != planner.s_goal[1])
+    xs_ng, ys_ng = xs[not_goal], ys[not_goal]
+    planner.rhs[xs_ng, ys_ng] = compute_rhs(planner.g, planner.map.grid, xs_ng, ys_ng, planner.connectivity)
+    planner.stats.vertex_updates += len(xs)
+    planner.stats.rhs_recomputations += len(xs_ng)
+
+    g = planner.g[xs, ys]
+    rhs = planner.rhs[xs, ys]
+    g_rhs = np.minimum(g, rhs)
+    h = planner.heuristic_batch(planner.s_start, xs, ys)
+    k1 = g_rhs + h + planner.k_m
+    inconsistent = g != rhs
+
+    planner.stats.heap_pushes += int(inconsistent.sum())
+    open_list = planner.open_list
+    for u, key1, key2, push in zip(indices.tolist(), k1.tolist(), g_rhs.tolist(), inconsistent.tolist()):
+        if push:
+            open_list.put(u, (key1, key2))
+        else:
+            open_list.remove(u)
+    return int(inconsistent.sum())
+
+def split_changes(changes):
+    if isinstance(changes, np.ndarray):
+        changes = changes.reshape(-1, 3)
+        return changes[:, :2].astype(np.intp), changes[:, 2]
+    changes = list(changes)
+    cells = np.array([cell for cell, _ in changes], dtype=np.intp).reshape(-1, 2)
+    costs = np.array([cost for _, cost in changes], dtype=float)
+    return cells, costs
+
+def with_neighbors(cells, x_dim, y_dim, offsets=STRAIGHT_OFFSETS):
+    cells = np.asarray(cells, dtype=np.intp).reshape(-1, 2)
+    shifted = [cells] + [cells + offset for offset in offsets]
+    cells = np.concatenate(shifted)
+    inside = (cells[:, 0] >= 0) & (cells[:, 0] < x_dim) & (cells[:, 1] >= 0) & (cells[:, 1] < y_dim)
+    return as_cells(cells[inside])
+
+def apply_changes(planner, changes):
+    cells, costs = split_changes(changes)
+    if len(cells) == 0:
+        return 0
+    old_costs = np.asarray(planner.map.grid[cells[:, 0], cells[:, 1]])
+    planner.map.set_costs(cells[:, 0], cells[:, 1], costs)
+    notify_changes = getattr(planner.heuristic, 'notify_changes', None)
+    if notify_changes is not None:
+        notify_changes(cells, old_costs, costs)
+    affected = with_neighbors(cells, planner.map.x_dim, planner.map.y_dim, neighbor_offsets(planner.connectivity))
+    planner.update_vertices(affected)
+    return len(affected)
@@ -0,0 +1,146 @@
+import argparse
+import csv
+import json
+import sys
+import numpy as np
+
+TIME_METRICS = ('plan_time', 'replan_time_total', 'extract_time_total')
+MEMORY_METRICS = ('memory_usage', 'plan_traced_peak', 'replan_traced_peak', 'g_rhs_peak_bytes', 'open_list_peak_bytes',
+                  'visited_nodes_peak_bytes', 'neighbor_table_peak_bytes', 'path_peak_bytes')
+GROUP_FIELDS = ('algorithm', 'grid_size', 'density')
+
+def load_rows(path):
+    # Per-trial rows as written by main_benchmark, JSON lines or CSV.
+    with open(path, newline='') as file:
+        text = file.read()
+    if text.lstrip().startswith('{'):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    rows = []
+    for row in csv.DictReader(text.splitlines()):
+        for name, value in row.items():
+            try:
+                row[name] = float(value)
+            except (TypeError, ValueError):
+                pass
+        rows.append(row)
+    return rows
+
+def group_rows(rows):
+    groups = {}
+    for row in rows:
+        key = (row['algorithm'], int(row['grid_size']), float(row['density']))
+        groups.setdefault(key, []).append(row)
+    return groups
+
+def seed_scales(rows, name, seeds):
+    # Seeds differ far more from each other than trials of one seed do, so every trial is divided by the
+    # baseline median of its own seed before runs are compared.
+    return {seed: float(np.median([row[name] for row in rows if row.get('seed') == seed])) for seed in seeds}
+
+def run_median(rows, name, scales):
+    # One number per run: the median of its seed-normalized trials. Trials of one run share its machine state,
+    # so they are not independent samples of the code's speed; whole runs are. Seeds without a scale are left out.
+    values = []
+    for row in rows:
+        scale = scales.get(row.get('seed'))
+        if scale is None:
+            continue
+        if scale == 0:
+            # 0 stays 1 (unchanged) and anything that appears where the baseline had nothing counts double.
+            values.append(1.0 if row[name] == 0 else 2.0)
+        else:
+            values.append(row[name] / scale)
+    return float(np.median(values)) if values else None
+
+def deterministic(runs, name):
+    # Array sizes and the like: within each run, every trial of a seed gives the same value.
+    for rows in runs:
+        values = {}
+        for row in rows:
+            if values.setdefault(row.get('seed'), row[name]) != row[name]:
+                return False
+    return True
+
+def compare(baseline_runs, current_rows, metrics=None, threshold=0.2, min_runs=4):
+    # One entry per group and metric found in every run. A regression is a current run median above the slowest
+    # baseline run's median by more than threshold, an improvement one below the fastest by as much, so the
+    # drift between runs of the same code is taken from the baseline runs themselves. Metrics that vary between
+    # trials need min_runs baseline runs for a verdict; deterministic ones need one.
+    baseline_groups = [group_rows(rows) for rows in baseline_runs]
+    current_groups = group_rows(current_rows)
+    results = []
+    for key in sorted(set(current_groups).intersection(*baseline_groups)):
+        runs = [groups[key] for groups in baseline_groups]
+        after = current_groups[key]
+        pooled = [row for rows in runs for row in rows]
+        seeds = {row.get('seed') for row in pooled} & {row.get('seed') for row in after}
+        names = metrics or [name for name in TIME_METRICS + MEMORY_METRICS if name in pooled[0] and name in after[0]]
+        for name in names:
+            scales = seed_scales(pooled, name, seeds)
+            medians = [median for median in (run_median(rows, name, scales) for rows in runs) if median is not None]
+            current = run_median(after, name, scales)
+            entry = dict(zip(GROUP_FIELDS, key))
+            entry.update({
+                'metric': name,
+                'baseline_runs': len(medians),
+                'baseline_median': float(np.median([row[name] for row in pooled])),
+                'current_median': float(np.median([row[name] for row in after])),
+            })
+            if current is None or not medians or (len(medians) < min_runs and not deterministic(runs + [after], name)):
+                entry['status'] = 'insufficient'
+                results.append(entry)
+                continue
+            center = float(np.median(medians))
+            # Seed-normalized medians relative to the middle baseline run.
+            entry['ratio'] = current / center if center else 1.0
+            entry['baseline_low'] = min(medians) / center if center else 1.0
+            entry['baseline_high'] = max(medians) / center if center else 1.0
+            if current > max(medians) * (1 + threshold):
+                entry['status'] = 'regression'
+            elif current < min(medians) * (1 - threshold):
+                entry['status'] = 'improvement'
+            else:
+                entry['status'] = 'unchanged'
+            results.append(entry)
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a benchmark run against stored baseline runs and flag regressions.")
+    parser.add_argument('baseline', nargs='+', help="per-trial rows of several baseline runs of the same code "
+                                                    "(main_benchmark --output); timings need at least --min-runs")
+    parser.add_argument('current', help="per-trial rows of the run to check")
+    parser.add_argument('--metrics', nargs='+', default=None, help="metrics to compare; default is every known time and memory metric in all runs")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative change beyond the slowest (fastest) baseline run that is flagged")
+    parser.add_argument('--min-runs', type=int, default=4, help="baseline runs needed to judge metrics that vary between trials")
+    parser.add_argument('--output', default=None, help="optional JSON file for every comparison")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline_runs = [load_rows(path) for path in args.baseline]
+    current_rows = load_rows(args.current)
+    for name in ('seed', 'connectivity', 'heuristic'):
+        if any({row.get(name) for row in rows} != {row.get(name) for row in current_rows} for rows in baseline_runs):
+            print(f"Warning: the runs differ in {name}; groups may not be comparable.", file=sys.stderr)
+    results = compare(baseline_runs, current_rows, args.metrics, args.threshold, args.min_runs)
+    regressions = [entry for entry in results if entry['status'] == 'regression']
+    for entry in results:
+        if entry['status'] in ('regression', 'improvement'):
+            print(f"{entry['status'].upper()} {entry['algorithm']} {entry['grid_size']}x{entry['grid_size']} density "
+                  f"{entry['density']} {entry['metric']}: median {entry['baseline_median']:.6g} -> {entry['current_median']:.6g} "
+                  f"({(entry['ratio'] - 1) * 100:+.1f}%, baseline runs {(entry['baseline_low'] - 1) * 100:+.1f}% to "
+                  f"{(entry['baseline_high'] - 1) * 100:+.1f}%)", file=sys.stderr)
+    insufficient = sum(1 for entry in results if entry['status'] == 'insufficient')
+    print(f"{len(results)} comparisons: {len(regressions)} regressions, "
+          f"{sum(1 for entry in results if entry['status'] == 'improvement')} improvements, {insufficient} without a verdict",
+          file=sys.stderr)
+    if insufficient and len(baseline_runs) < args.min_runs:
+        print(f"Timings need {args.min_runs} baseline runs to measure run-to-run drift.", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    # Non-zero exit status so a CI job fails on regressions.
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,46 @@
 import numpy as np
-import heapq
 import time
-from concurrent.futures import ThreadPoolExecutor
-
-class PriorityQueue:
-    def __init__(self):
-        self.elements = []
-
-    def empty(self):
-        return len(self.elements) == 0
-
-    def put(self, item, priority):
-        heapq.heappush(self.elements, (priority, item))
-
-    def get(self):
-        return heapq.heappop(self.elements)[1]
+from priority_queue import PriorityQueue
+import batch_update
+import grid_graph
+from heuristics import make_heuristic
+from planner_stats import PlannerStats
+from visited_cells import VisitedCells
+from path_cache import PathCache
 
 class DStar:
-    def __init__(self, map, s_start, s_goal, headless=False):
+    def __init__(self, map, s_start, s_goal, headless=False, random_obstacles=True, cost_dtype=np.float64, connectivity=4, heuristic='auto'):
         self.map = map
         self.s_start = s_start
         self.s_goal = s_goal
+        self.s_last = s_start
         self.headless = headless
-
-        self.g = np.ones((map.x_dim, map.y_dim)) * np.inf
-        self.rhs = np.ones((map.x_dim, map.y_dim)) * np.inf
+        self.connectivity = connectivity
+        self.heuristic, self.heuristic_batch = make_heuristic(heuristic, map, connectivity)
+        self.stats = PlannerStats()
+        self.on_expand = None
+        self.on_replan = None
+        self.timeout = 30
+
+        # g and rhs are 2-D for callers; the search works on flat views of the same memory.
+        self.g = np.full((map.x_dim, map.y_dim), np.inf, dtype=cost_dtype)
+        self.rhs = np.full((map.x_dim, map.y_dim), np.inf, dtype=cost_dtype)
+        self.g_flat = self.g.reshape(-1)
+        self.rhs_flat = self.rhs.reshape(-1)
         self.g[s_goal] = 0
         self.rhs[s_goal] = 0
 
+        if random_obstacles:
+            self.place_random_obstacles(10, 100)
+
+        self.table = grid_graph.NeighborTable(map.grid, connectivity)
+        self.goal_index = self.table.index(s_goal)
         self.open_list = PriorityQueue()
         self.k_m = 0
-        self.open_list.put(s_goal, self.calculate_key(s_goal))
-
-        self.place_random_obstacles(10, 100)
+        self.open_list.put(self.goal_index, self.key(self.goal_index))
 
-        self.visited_nodes = []
+        self.visited_nodes = VisitedCells(map.x_dim, map.y_dim)
+        self.path_cache = PathCache(self)
 
         if not self.headless:
             print(f"Initializing D* with start: {s_start}, goal: {s_goal}, map size: {map.x_dim}x{map.y_dim}")
@@ -48,98 +54,118 @@ class DStar:
                 self.map.grid[x, y] = -1
 
     def calculate_key(self, s):
-        g_rhs = min(self.g[s], self.rhs[s])
-        return (g_rhs + self.heuristic(self.s_start, s) + self.k_m, g_rhs)
+        return self.key(self.table.index(s))
 
-    def heuristic(self, a, b):
-        return np.sqrt((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2)
+    def key(self, u):
+        g_rhs = min(self.g_flat[u], self.rhs_flat[u])
+        return (g_rhs + self.heuristic(self.s_start, divmod(u, self.table.y_dim)) + self.k_m, g_rhs)
 
     def update_vertex(self, u):
-        #print(f"Updating vertex: {u}")
-        if u != self.s_goal:
-            neighbors = self.get_neighbors(u)
-            self.rhs[u] = min([self.g[neighbor] + 1 for neighbor in neighbors if self.map.grid[neighbor] != -1])
-        if u in [item[1] for item in self.open_list.elements]:
-            self.open_list.elements = [(p, i) for p, i in self.open_list.elements if i != u]
-            heapq.heapify(self.open_list.elements)
-        if self.g[u] != self.rhs[u]:
-            self.open_list.put(u, self.calculate_key(u))
+        self.update_index(self.table.index(u))
+
+    def update_index(self, u):
+        stats = self.stats
+        stats.vertex_updates += 1
+        g = self.g_flat
+        rhs = self.rhs_flat
+        if u != self.goal_index:
+            stats.rhs_recomputations += 1
+            table = self.table
+            if not table.ready[u]:
+                table.build(u)
+            if table.blocked[u]:
+                rhs[u] = np.inf
+            else:
+                best = np.inf
+                k = table.k
+                values = table.values
+                for delta, code in zip(table.deltas, table.codes[u * k:u * k + k]):
+                    if code:
+                        value = g[u + delta] + values[code]
+                        if value < best:
+                            best = value
+                rhs[u] = best
+        if g[u] != rhs[u]:
+            stats.heap_pushes += 1
+            self.open_list.put(u, self.key(u))
+        else:
+            self.open_list.remove(u)
+
+    def update_vertices(self, cells):
+        return batch_update.update_vertices(self, cells)
+
+    def get_successors(self, s):
+        table = self.table
+        return [(table.cell(v), cost) for v, cost in table.successors(table.index(s))]
 
     def get_neighbors(self, s):
-        x, y = s
-        neighbors = []
-        if x > 0 and self.map.grid[x - 1, y] != -1:
-            neighbors.append((x - 1, y))
-        if x < self.map.x_dim - 1 and self.map.grid[x + 1, y] != -1:
-            neighbors.append((x + 1, y))
-        if y > 0 and self.map.grid[x, y - 1] != -1:
-            neighbors.append((x, y - 1))
-        if y < self.map.y_dim - 1 and self.map.grid[x, y + 1] != -1:
-            neighbors.append((x, y + 1))
-        #print(f"Neighbors of {s}: {neighbors}")
-        return neighbors
-
-    def compute_shortest_path(self):
+        return [neighbor for neighbor, _ in self.get_successors(s)]
+
+    def compute_shortest_path(self, return_path=True):
         start_time = time.time()
+        timer_start = time.perf_counter()
         iterations = 0
-        with ThreadPoolExecutor() as executor:
-            while not self.open_list.empty():
-                iterations += 1
-                u = self.open_list.get()
-                self.visited_nodes.append(u)
-                print(f"Processing node: {u}, g: {self.g[u]}, rhs: {self.rhs[u]}")
-                if self.g[u] > self.rhs[u]:
-                    self.g[u] = self.rhs[u]
-                    for s in self.get_neighbors(u):
-                        executor.submit(self.update_vertex, s)
-                else:
-                    self.g[u] = np.inf
-                    self.update_vertex(u)
-                    for s in self.get_neighbors(u):
-                        executor.submit(self.update_vertex, s)
-                if time.time() - start_time > 30:  # 30 Sekunden Timeout
-                    if not self.headless:
-                        print(f"Timeout during shortest path computation after {iterations} iterations")
-                    break
-            if not self.headless:
-                print(f"Shortest path computed in {iterations} iterations.")
-        return self.extract_path()
+        on_expand = self.on_expand
+        table = self.table
+        g = self.g_flat
+        rhs = self.rhs_flat
+        open_list = self.open_list
+        visited_nodes = self.visited_nodes
+        changed = self.path_cache.dirty if self.path_cache.cells is not None else None
+        while not open_list.empty():
+            iterations += 1
+            u = open_list.get()
+            visited_nodes.add_index(u)
+            if changed is not None:
+                changed.append(u)
+            if on_expand is not None:
+                on_expand(table.cell(u))
+            if g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for s in table.successors(u):
+                    self.update_index(s[0])
+            else:
+                g[u] = np.inf
+                self.update_index(u)
+                for s in table.successors(u):
+                    self.update_index(s[0])
+            if time.time() - start_time > self.timeout:
+                if not self.headless:
+                    print(f"Timeout during shortest path computation after {iterations} iterations")
+                break
+        if not self.headless:
+            print(f"Shortest path computed in {iterations} iterations.")
+        stats = self.stats
+        stats.expansions += iterations
+        stats.replans += 1
+        stats.record_time('compute_shortest_path', time.perf_counter() - timer_start)
+        if self.on_replan is not None:
+            self.on_replan(self)
+        return self.extract_path() if return_path else None
 
     def move_and_replan(self, robot_position):
         self.s_start = robot_position
-        self.k_m += self.heuristic(self.s_start, self.s_goal)
-        print(f"Replanning from new start position: {robot_position}")
+        self.k_m += self.heuristic(self.s_last, self.s_start)
+        self.s_last = self.s_start
+        if not self.headless:
+            print(f"Replanning from new start position: {robot_position}")
         path = self.compute_shortest_path()
         return path, self.visited_nodes
 
     def extract_path(self):
-        path = []
-        current = self.s_start
-        while current != self.s_goal:
-            path.append(current)
-            neighbors = self.get_neighbors(current)
-            if not neighbors:
-                print("No available neighbors to move to.")
-                break
-            current = min(neighbors, key=lambda s: self.g[s])
-            if self.g[current] == np.inf:
-                if not self.headless:
-                    print("Path blocked or goal unreachable.")
-                break
-        path.append(self.s_goal)
-        print(f"Extracted path: {path}")
-        return path
+        with self.stats.timer('extract_path'):
+            return self._extract_path()
+
+    def _extract_path(self):
+        return self.path_cache.extract()
 
     def modify_cost(self, X, Y, new_cost):
-        old_cost = self.map.grid[X][Y]
-        self.map.grid[X][Y] = new_cost
-        #print(f"Modified cost from {X} to {Y}, old cost: {old_cost}, new cost: {new_cost}")
-        if new_cost > old_cost:
-            if X not in [item[1] for item in self.open_list.elements]:
-                self.open_list.put(X, self.calculate_key(X))
-            X_state = 'RAISE'
-        else:
-            if X not in [item[1] for item in self.open_list.elements]:
-                self.open_list.put(X, self.calculate_key(X))
-            X_state = 'LOWER'
-        self.update_vertex(X)
+        self.apply_changes([((X, Y), new_cost)], replan=False)
+
+    def apply_changes(self, changes, replan=True):
+        self.k_m += self.heuristic(self.s_last, self.s_start)
+        self.s_last = self.s_start
+        with self.stats.timer('apply_changes'):
+            touched = batch_update.apply_changes(self, changes)
+        path = self.compute_shortest_path() if replan else None
+        return path, touched
@@ -0,0 +1,163 @@
+import math
+from array import array
+import numpy as np
+
+SQRT2 = math.sqrt(2)
+STRAIGHT_OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+DIAGONAL_OFFSETS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# Grid values: -1 is an obstacle, anything else is the cost of entering the cell (0 and 1 both cost 1).
+
+def neighbor_offsets(connectivity):
+    if connectivity == 4:
+        return STRAIGHT_OFFSETS
+    if connectivity == 8:
+        return STRAIGHT_OFFSETS + DIAGONAL_OFFSETS
+    raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+
+def cell_cost(value):
+    return float(value) if value > 1 else 1.0
+
+def successors(map, s, connectivity=4):
+    grid = map.grid
+    x_dim, y_dim = map.x_dim, map.y_dim
+    x, y = s
+    result = []
+    for dx, dy in STRAIGHT_OFFSETS:
+        nx, ny = x + dx, y + dy
+        if 0 <= nx < x_dim and 0 <= ny < y_dim:
+            value = grid[nx, ny]
+            if value != -1:
+                result.append(((nx, ny), float(value) if value > 1 else 1.0))
+    if connectivity == 8:
+        for dx, dy in DIAGONAL_OFFSETS:
+            nx, ny = x + dx, y + dy
+            # No corner cutting: both cells beside the diagonal must be free.
+            if 0 <= nx < x_dim and 0 <= ny < y_dim and grid[nx, y] != -1 and grid[x, ny] != -1:
+                value = grid[nx, ny]
+                if value != -1:
+                    result.append(((nx, ny), SQRT2 * (float(value) if value > 1 else 1.0)))
+    return result
+
+def neighbors_in_bounds(map, s, connectivity=4):
+    x, y = s
+    return [(x + dx, y + dy) for dx, dy in neighbor_offsets(connectivity)
+            if 0 <= x + dx < map.x_dim and 0 <= y + dy < map.y_dim]
+
+def edge_costs(grid, xs, ys, dx, dy):
+    # Vectorized c(u, u + (dx, dy)) for arrays of cells; inf where the move is not possible.
+    x_dim, y_dim = grid.shape
+    nx = xs + dx
+    ny = ys + dy
+    inside = (nx >= 0) & (nx < x_dim) & (ny >= 0) & (ny < y_dim)
+    nx = np.clip(nx, 0, x_dim - 1)
+    ny = np.clip(ny, 0, y_dim - 1)
+    values = np.asarray(grid[nx, ny], dtype=np.float64)
+    free = inside & (values != -1)
+    if dx != 0 and dy != 0:
+        free &= (grid[nx, np.clip(ys, 0, y_dim - 1)] != -1) & (grid[np.clip(xs, 0, x_dim - 1), ny] != -1)
+    step = SQRT2 if dx != 0 and dy != 0 else 1.0
+    return np.where(free, step * np.maximum(values, 1.0), np.inf), nx, ny
+
+class NeighborTable:
+    # Flat cell ids (x * y_dim + y) and a constant-stride, CSR-style edge table: codes[u * k + j] is the cost
+    # class of moving from u to u + deltas[j] and values[code] its cost, code 0 (inf) where that move is not
+    # possible (off the grid, into an obstacle or, on 8-connected grids, cutting a corner). Only a handful of
+    # distinct costs exist, so one byte per edge is enough, two once more than 255 show up. Rows are built a
+    # tile at a time when a cell of the tile is first read, so on a TiledGrid only the tiles a search reaches
+    # get loaded, and patched in place when cells change, so the planners' inner loops never touch the grid
+    # or build tuples. Readers call build(u) while ready[u] is 0.
+    TILE_SIZE = 256
+
+    def __init__(self, grid, connectivity=4):
+        self.grid = grid
+        self.x_dim, self.y_dim = grid.shape
+        self.connectivity = connectivity
+        self.offsets = neighbor_offsets(connectivity)
+        self.k = len(self.offsets)
+        self.deltas = [dx * self.y_dim + dy for dx, dy in self.offsets]
+        self.tile_size = getattr(grid, 'tile_size', self.TILE_SIZE)
+        size = self.x_dim * self.y_dim
+        self.values = [math.inf]
+        self.value_codes = {math.inf: 0}
+        self.codes = array('B', [0]) * (size * self.k)
+        self.blocked = bytearray(size)
+        self.ready = bytearray(size)
+        self.built_tiles = set()
+
+    def _encode(self, costs):
+        values, inverse = np.unique(costs, return_inverse=True)
+        for value in values.tolist():
+            if value not in self.value_codes:
+                self.value_codes[value] = len(self.values)
+                self.values.append(value)
+        if len(self.values) > 256 and self.codes.typecode == 'B':
+            self.codes = array('H', self.codes)
+        lookup = np.array([self.value_codes[value] for value in values.tolist()], dtype=self.codes.typecode)
+        return lookup[inverse.ravel()]
+
+    def _write(self, grid, xs, ys):
+        # One column at a time, so a tile's temporaries stay a few arrays of its size.
+        indices = xs * self.y_dim + ys
+        for j, (dx, dy) in enumerate(self.offsets):
+            costs, _, _ = edge_costs(grid, xs, ys, dx, dy)
+            codes = self._encode(costs)
+            # Writable view of the flat buffer, taken after _encode may have widened it.
+            np.frombuffer(self.codes, dtype=self.codes.typecode).reshape(-1, self.k)[indices, j] = codes
+        np.frombuffer(self.blocked, dtype=np.uint8)[indices] = np.asarray(grid[xs, ys]) == -1
+        return indices
+
+    def build(self, u):
+        x, y = divmod(u, self.y_dim)
+        self.build_tile(x // self.tile_size, y // self.tile_size)
+
+    def build_tile(self, tx, ty):
+        if (tx, ty) in self.built_tiles:
+            return
+        size = self.tile_size
+        xs, ys = np.meshgrid(np.arange(tx * size, min((tx + 1) * size, self.x_dim)),
+                             np.arange(ty * size, min((ty + 1) * size, self.y_dim)), indexing='ij')
+        indices = self._write(self.grid, xs.ravel(), ys.ravel())
+        np.frombuffer(self.ready, dtype=np.uint8)[indices] = 1
+        self.built_tiles.add((tx, ty))
+
+    def refresh(self, grid, xs, ys):
+        # Re-derives the rows of the given cells. Every edge whose cost depends on a changed cell starts at
+        # the cell itself or at one of its neighbors, so refreshing changed cells plus neighbors is enough.
+        # Cells of tiles not built yet are skipped; they read the grid when they are.
+        xs = np.asarray(xs, dtype=np.intp)
+        ys = np.asarray(ys, dtype=np.intp)
+        if len(xs) == 0:
+            return
+        built = np.frombuffer(self.ready, dtype=np.uint8)[xs * self.y_dim + ys] == 1
+        if not built.all():
+            xs, ys = xs[built], ys[built]
+            if len(xs) == 0:
+                return
+        self._write(grid, xs, ys)
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + len(self.blocked) + len(self.ready)
+
+    def index(self, cell):
+        return cell[0] * self.y_dim + cell[1]
+
+    def cell(self, u):
+        return divmod(u, self.y_dim)
+
+    def successors(self, u):
+        if not self.ready[u]:
+            self.build(u)
+        k = self.k
+        values = self.values
+        return [(u + delta, values[code]) for delta, code in zip(self.deltas, self.codes[u * k:u * k + k]) if code]
+
+    def neighbors(self, u):
+        # Edges exist in both directions or in neither, except that nothing leaves an obstacle. So the cells
+        # whose rhs depends on a free u are exactly its successors, and none depend on an obstacle.
+        if not self.ready[u]:
+            self.build(u)
+        if self.blocked[u]:
+            return []
+        k = self.k
+        return [u + delta for delta, code in zip(self.deltas, self.codes[u * k:u * k + k]) if code]
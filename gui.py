@@ -1,11 +1,6 @@
 import pygame
 import numpy as np
-
-class OccupancyGridMap:
-    def __init__(self, x_dim, y_dim):
-        self.x_dim = x_dim
-        self.y_dim = y_dim
-        self.grid = np.zeros((x_dim, y_dim))
+from occupancy_grid import OccupancyGridMap
 
 class Animation:
     def __init__(self, title, width, height, margin, x_dim, y_dim, start, goal, viewing_range):
@@ -31,13 +26,14 @@ class Animation:
         return OccupancyGridMap(x_dim, y_dim)
 
     def reset_world(self):
-        self.world.grid[self.start[0]][self.start[1]] = 1
-        self.world.grid[self.goal[0]][self.goal[1]] = 2
+        self.world.start = self.start
+        self.world.goal = self.goal
 
     def run_game(self, path, visited_nodes):
         running = True
         clock = pygame.time.Clock()
-        
+        renderer = GridRenderer(self.screen, self.world, self.width, self.height)
+
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -46,32 +42,163 @@ class Animation:
                     if event.key == pygame.K_ESCAPE:
                         running = False
 
-            self.screen.fill((255, 255, 255))
-
-            for x in range(self.world.x_dim):
-                for y in range(self.world.y_dim):
-                    color = (255, 255, 255)  # Default color is white (background)
-                    if self.world.grid[x][y] == -1:
-                        color = (0, 0, 0)  # Obstacles
-                    elif self.world.grid[x][y] == 1:
-                        color = (53,144,174)  # Start node (yellow)
-                    elif self.world.grid[x][y] == 2:
-                        color = (255, 0, 0)  # Goal node (red)
-                    pygame.draw.rect(self.screen, color, pygame.Rect(x * 10, y * 10, 10, 10))
-                    pygame.draw.rect(self.screen, (0, 0, 0), pygame.Rect(x * 10, y * 10, 10, 10), 1)  # Grid border
-
-            for (x, y) in visited_nodes:
-                if (x, y) != self.start and (x, y) != self.goal:
-                    pygame.draw.rect(self.screen, (173, 216, 230), pygame.Rect(x * 10, y * 10, 10, 10))  # Visited nodes are blue
-                    pygame.draw.rect(self.screen, (0, 0, 0), pygame.Rect(x * 10, y * 10, 10, 10), 1)  # Visited nodes border
-
-            for (x, y) in path:
-                if (x, y) != self.start and (x, y) != self.goal:
-                    pygame.draw.rect(self.screen, (0, 255, 0), pygame.Rect(x * 10, y * 10, 10, 10))  # Shortest path is green
-                    pygame.draw.rect(self.screen, (0, 0, 0), pygame.Rect(x * 10, y * 10, 10, 10), 1)  # Shortest path border
-
-            pygame.display.flip()
+            renderer.draw(path, visited_nodes)
             clock.tick(10)
 
+        renderer.close()
         pygame.quit()
         print("Path drawn.")
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+START_COLOR = (53, 144, 174)
+GOAL_COLOR = (255, 0, 0)
+VISITED_COLOR = (173, 216, 230)
+PATH_COLOR = (0, 255, 0)
+BORDER_KEY = (255, 0, 255)
+
+class GridRenderer:
+    # Cell colors live in an RGB buffer indexed [x, y] like the grid, which is the layout pygame.surfarray uses.
+    # Each frame only cells whose obstacle, visited, path or start/goal state changed are recolored and redrawn;
+    # a full blit-and-scale happens on the first frame or when most of the visible cells changed. Obstacles are
+    # read from the whole grid once; after that only cells the map reports through set_costs are looked at.
+    CELL_SIZE = 10
+    FULL_REDRAW_FRACTION = 0.25
+
+    def __init__(self, screen, world, width, height):
+        self.screen = screen
+        self.world = world
+        size = self.CELL_SIZE
+        self.x_dim = world.x_dim
+        self.y_dim = world.y_dim
+        # Cells beyond the window are tracked but never drawn.
+        self.visible_x = min(self.x_dim, -(-width // size))
+        self.visible_y = min(self.y_dim, -(-height // size))
+        self.pixels = np.zeros((self.x_dim, self.y_dim, 3), dtype=np.uint8)
+        self.obstacles = np.zeros((self.x_dim, self.y_dim), dtype=bool)
+        self.map_changes = []
+        world.listeners.append(self.on_map_change)
+        self.visited = np.zeros((self.x_dim, self.y_dim), dtype=bool)
+        self.on_path = np.zeros((self.x_dim, self.y_dim), dtype=bool)
+        self.visited_source = None
+        self.visited_count = 0
+        self.path_source = None
+        self.markers = (None, None)
+        self.drawn = False
+        self.cells = pygame.Surface((self.visible_x, self.visible_y))
+        self.scaled = pygame.Surface((self.visible_x * size, self.visible_y * size))
+        self.borders = self.make_borders()
+
+    def make_borders(self):
+        # Built once: the 1-pixel outline of every visible cell, with everything else transparent.
+        size = self.CELL_SIZE
+        borders = pygame.Surface((self.visible_x * size, self.visible_y * size))
+        borders.fill(BORDER_KEY)
+        borders.set_colorkey(BORDER_KEY)
+        for x in range(self.visible_x):
+            borders.fill(BLACK, pygame.Rect(x * size, 0, 1, self.visible_y * size))
+            borders.fill(BLACK, pygame.Rect(x * size + size - 1, 0, 1, self.visible_y * size))
+        for y in range(self.visible_y):
+            borders.fill(BLACK, pygame.Rect(0, y * size, self.visible_x * size, 1))
+            borders.fill(BLACK, pygame.Rect(0, y * size + size - 1, self.visible_x * size, 1))
+        return borders
+
+    def on_map_change(self, xs, ys):
+        self.map_changes.append(np.column_stack([np.asarray(xs, dtype=np.intp).ravel(), np.asarray(ys, dtype=np.intp).ravel()]))
+
+    def close(self):
+        self.world.listeners.remove(self.on_map_change)
+
+    def cell_mask(self, cells):
+        mask = np.zeros((self.x_dim, self.y_dim), dtype=bool)
+        cells = np.asarray(list(cells), dtype=np.intp).reshape(-1, 2)
+        mask[cells[:, 0], cells[:, 1]] = True
+        return mask
+
+    def changed_cells(self, path, visited_nodes):
+        changed = []
+        if not self.drawn:
+            self.map_changes = []
+            self.obstacles = np.asarray(self.world.grid) == -1
+        elif self.map_changes:
+            cells = np.concatenate(self.map_changes)
+            self.map_changes = []
+            obstacles = np.asarray(self.world.grid[cells[:, 0], cells[:, 1]]) == -1
+            changed.append(cells[obstacles != self.obstacles[cells[:, 0], cells[:, 1]]])
+            self.obstacles[cells[:, 0], cells[:, 1]] = obstacles
+
+        # VisitedCells only grows between clears, so an unchanged count means an unchanged set.
+        count = len(visited_nodes)
+        if visited_nodes is not self.visited_source or count != self.visited_count:
+            mask = visited_nodes.mask if hasattr(visited_nodes, 'mask') else self.cell_mask(visited_nodes)
+            changed.append(np.argwhere(mask != self.visited))
+            self.visited = mask
+            self.visited_source = visited_nodes
+            self.visited_count = count
+
+        if path is not self.path_source:
+            mask = self.cell_mask(path)
+            changed.append(np.argwhere(mask != self.on_path))
+            self.on_path = mask
+            self.path_source = path
+
+        markers = (self.world.start, self.world.goal)
+        if markers != self.markers:
+            changed.append(np.array([cell for cell in markers + self.markers if cell is not None], dtype=np.intp).reshape(-1, 2))
+            self.markers = markers
+
+        if not changed:
+            return np.empty((0, 2), dtype=np.intp)
+        cells = np.concatenate(changed)
+        return np.unique(cells, axis=0) if len(cells) > 1 else cells
+
+    def recolor(self, xs, ys):
+        colors = np.empty((len(xs), 3), dtype=np.uint8)
+        colors[:] = WHITE
+        colors[self.obstacles[xs, ys]] = BLACK
+        colors[self.visited[xs, ys]] = VISITED_COLOR
+        colors[self.on_path[xs, ys]] = PATH_COLOR
+        # Start and goal are drawn in their own colors unless they sit on an obstacle.
+        for marker, color in zip(self.markers, (START_COLOR, GOAL_COLOR)):
+            if marker is not None:
+                at_marker = (xs == marker[0]) & (ys == marker[1]) & ~self.obstacles[xs, ys]
+                colors[at_marker] = color
+        self.pixels[xs, ys] = colors
+
+    def draw(self, path, visited_nodes):
+        if not self.drawn:
+            xs, ys = np.indices((self.x_dim, self.y_dim))
+            self.changed_cells(path, visited_nodes)
+            self.recolor(xs.ravel(), ys.ravel())
+            self.redraw_all()
+            self.drawn = True
+            return
+        cells = self.changed_cells(path, visited_nodes)
+        if len(cells) == 0:
+            return
+        xs, ys = cells[:, 0], cells[:, 1]
+        self.recolor(xs, ys)
+        visible = (xs < self.visible_x) & (ys < self.visible_y)
+        xs, ys = xs[visible], ys[visible]
+        if len(xs) > self.FULL_REDRAW_FRACTION * self.visible_x * self.visible_y:
+            self.redraw_all()
+        else:
+            self.redraw_cells(xs, ys)
+
+    def redraw_all(self):
+        pygame.surfarray.blit_array(self.cells, self.pixels[:self.visible_x, :self.visible_y])
+        pygame.transform.scale(self.cells, self.scaled.get_size(), self.scaled)
+        self.screen.fill(WHITE)
+        self.screen.blit(self.scaled, (0, 0))
+        self.screen.blit(self.borders, (0, 0))
+        pygame.display.flip()
+
+    def redraw_cells(self, xs, ys):
+        size = self.CELL_SIZE
+        rects = []
+        for x, y, color in zip(xs.tolist(), ys.tolist(), self.pixels[xs, ys].tolist()):
+            rect = pygame.Rect(x * size, y * size, size, size)
+            self.screen.fill(color, rect)
+            self.screen.blit(self.borders, rect, rect)
+            rects.append(rect)
+        pygame.display.update(rects)
@@ -0,0 +1,242 @@
+import math
+import weakref
+import numpy as np
+from grid_graph import SQRT2, neighbor_offsets, edge_costs
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+def octile(a, b):
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+def euclidean(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+def zero(a, b):
+    return 0.0
+
+def manhattan_batch(a, xs, ys):
+    return np.abs(xs - a[0]) + np.abs(ys - a[1])
+
+def octile_batch(a, xs, ys):
+    dx = np.abs(xs - a[0])
+    dy = np.abs(ys - a[1])
+    return np.maximum(dx, dy) + (SQRT2 - 1) * np.minimum(dx, dy)
+
+def euclidean_batch(a, xs, ys):
+    return np.hypot(xs - a[0], ys - a[1])
+
+def zero_batch(a, xs, ys):
+    return np.zeros(np.shape(xs))
+
+HEURISTICS = {
+    'manhattan': (manhattan, manhattan_batch),
+    'octile': (octile, octile_batch),
+    'euclidean': (euclidean, euclidean_batch),
+    'zero': (zero, zero_batch),
+}
+
+def get_heuristic(name, connectivity):
+    # 'auto' picks the tightest admissible distance for the grid's connectivity.
+    if name == 'auto':
+        name = 'manhattan' if connectivity == 4 else 'octile'
+    if name not in HEURISTICS:
+        raise ValueError(f"Unknown heuristic: {name}")
+    if name == 'manhattan' and connectivity == 8:
+        raise ValueError("The manhattan heuristic is not admissible on 8-connected grids")
+    return HEURISTICS[name]
+
+def direction_costs(grid, connectivity=4):
+    # Edge cost out of every cell in every direction, on a grid padded with one ring of obstacles
+    # so neighbor indices never leave the array.
+    padded = np.pad(np.asarray(grid), 1, constant_values=-1)
+    xs, ys = np.indices(padded.shape)
+    xs, ys = xs.ravel(), ys.ravel()
+    blocked = padded.ravel() == -1
+    costs = []
+    for dx, dy in neighbor_offsets(connectivity):
+        step, _, _ = edge_costs(padded, xs, ys, dx, dy)
+        step[blocked] = np.inf
+        costs.append(step)
+    return np.array(costs)
+
+def distance_table(grid, source, connectivity=4, reverse=False, costs=None):
+    # Vectorized label-correcting wavefront: every round relaxes the whole frontier in all directions at once.
+    # reverse=True gives distances *to* source instead of from it (costs are not symmetric).
+    # source may also be a list of cells, giving the distance from (or to) the nearest of them.
+    grid = np.asarray(grid)
+    x_dim, y_dim = grid.shape
+    if costs is None:
+        costs = direction_costs(grid, connectivity)
+    width = y_dim + 2
+    deltas = np.array([dx * width + dy for dx, dy in neighbor_offsets(connectivity)])
+    directions = np.arange(len(deltas))[:, None]
+    dist = np.full((x_dim + 2) * width, np.inf)
+    sources = np.asarray(source, dtype=np.intp).reshape(-1, 2)
+    sources = sources[grid[sources[:, 0], sources[:, 1]] != -1]
+    frontier = (sources[:, 0] + 1) * width + sources[:, 1] + 1
+    dist[frontier] = 0.0
+    while frontier.size:
+        if reverse:
+            targets = frontier[None, :] - deltas[:, None]
+            step = costs[directions, targets]
+        else:
+            targets = frontier[None, :] + deltas[:, None]
+            step = costs[:, frontier]
+        candidates = dist[frontier][None, :] + step
+        better = candidates < dist[targets]
+        targets = targets[better]
+        np.minimum.at(dist, targets, candidates[better])
+        frontier = np.unique(targets)
+    return dist.reshape(x_dim + 2, width)[1:-1, 1:-1]
+
+def _effective_costs(values):
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(values == -1, np.inf, np.maximum(values, 1.0))
+
+class LandmarkHeuristic:
+    # ALT lower bounds: d(a, b) >= d(L, b) - d(L, a) and d(a, b) >= d(a, L) - d(b, L) for every landmark L,
+    # combined with the plain distance heuristic for the connectivity.
+    # Lowered costs make the tables unusable until they are rebuilt, which takes 2 x num_landmarks whole-map
+    # wavefronts. So changes only drop them (searches fall back to the plain heuristic), and with auto_refresh
+    # they are rebuilt once, at the start of the next search, after refresh_after cells have been lowered.
+    FIELD_AFTER_CALLS = 64
+    REFRESH_AFTER = 64
+
+    def __init__(self, map, connectivity=4, num_landmarks=4, landmarks=None, auto_refresh=True, refresh_after=REFRESH_AFTER):
+        self.map = map
+        self.connectivity = connectivity
+        self.num_landmarks = num_landmarks
+        self.requested_landmarks = landmarks
+        self.auto_refresh = auto_refresh
+        self.refresh_after = refresh_after
+        self.base, self.base_batch = get_heuristic('auto', connectivity)
+        self.version = 0
+        self.refresh()
+
+    def select_landmarks(self, grid, costs):
+        # Farthest-point selection; the forward tables computed on the way are kept.
+        free = np.argwhere(grid != -1)
+        if len(free) == 0:
+            return [], []
+        landmarks = [tuple(int(v) for v in free[0])]
+        tables = [distance_table(grid, landmarks[0], self.connectivity, costs=costs)]
+        nearest = tables[0]
+        while len(landmarks) < self.num_landmarks:
+            reachable = np.where(np.isfinite(nearest), nearest, -1)
+            candidate = np.unravel_index(np.argmax(reachable), reachable.shape)
+            if reachable[candidate] <= 0:
+                break
+            landmarks.append((int(candidate[0]), int(candidate[1])))
+            tables.append(distance_table(grid, landmarks[-1], self.connectivity, costs=costs))
+            nearest = np.minimum(nearest, tables[-1])
+        return landmarks, tables
+
+    def refresh(self):
+        grid = np.asarray(self.map.grid)
+        costs = direction_costs(grid, self.connectivity)
+        if self.requested_landmarks:
+            self.landmarks = list(self.requested_landmarks)
+            tables = [distance_table(grid, landmark, self.connectivity, costs=costs) for landmark in self.landmarks]
+        else:
+            self.landmarks, tables = self.select_landmarks(grid, costs)
+        count = len(self.landmarks)
+        self.dist_from = np.empty((grid.size, count))
+        self.dist_to = np.empty((grid.size, count))
+        for k, landmark in enumerate(self.landmarks):
+            self.dist_from[:, k] = tables[k].ravel()
+            self.dist_to[:, k] = distance_table(grid, landmark, self.connectivity, reverse=True, costs=costs).ravel()
+        self.valid = True
+        self.version += 1
+        self.field = None
+        self.field_source = None
+        self.last_source = None
+        self.source_calls = 0
+        self.lowered = 0
+
+    def invalidate(self):
+        # The version only moves when the values do, so planners do not rekey for every further change.
+        if self.valid:
+            self.version += 1
+        self.valid = False
+        self.field = None
+        self.field_source = None
+
+    def notify_changes(self, cells, old_values, new_values):
+        # Raised costs keep the tables admissible; lowered costs can make them overestimate.
+        lowered = int(np.count_nonzero(_effective_costs(new_values) < _effective_costs(old_values)))
+        if lowered:
+            self.lowered += lowered
+            self.invalidate()
+
+    def prepare(self):
+        # Called by the planners before each search.
+        if not self.valid and self.auto_refresh and self.lowered >= self.refresh_after:
+            self.refresh()
+
+    def _bounds(self, rows_a, rows_b):
+        with np.errstate(invalid='ignore'):
+            forward = rows_b[0] - rows_a[0]
+            backward = rows_a[1] - rows_b[1]
+        bound = np.maximum(np.nan_to_num(forward, nan=0.0, posinf=0.0, neginf=0.0),
+                           np.nan_to_num(backward, nan=0.0, posinf=0.0, neginf=0.0))
+        return bound.max(axis=-1) if bound.shape[-1] else np.zeros(bound.shape[:-1])
+
+    def _rows(self, indices):
+        return self.dist_from[indices], self.dist_to[indices]
+
+    def _build_field(self, a):
+        y_dim = self.map.y_dim
+        rows_a = self._rows(a[0] * y_dim + a[1])
+        alt = self._bounds(rows_a, (self.dist_from, self.dist_to)).reshape(self.map.x_dim, y_dim)
+        xs, ys = np.indices((self.map.x_dim, y_dim))
+        self.field = np.maximum(alt, self.base_batch(a, xs, ys))
+        self.field_source = a
+
+    def __call__(self, a, b):
+        if not self.valid:
+            return self.base(a, b)
+        if a == self.field_source:
+            return self.field[b]
+        if a == self.last_source:
+            self.source_calls += 1
+            if self.source_calls >= self.FIELD_AFTER_CALLS:
+                self._build_field(a)
+                return self.field[b]
+        else:
+            self.last_source = a
+            self.source_calls = 1
+        y_dim = self.map.y_dim
+        bound = self._bounds(self._rows(a[0] * y_dim + a[1]), self._rows(b[0] * y_dim + b[1]))
+        return max(float(bound), self.base(a, b))
+
+    def batch(self, a, xs, ys):
+        if not self.valid:
+            return self.base_batch(a, xs, ys)
+        if a == self.field_source:
+            return self.field[xs, ys]
+        y_dim = self.map.y_dim
+        rows_a = self._rows(a[0] * y_dim + a[1])
+        rows_b = self._rows(xs * y_dim + ys)
+        return np.maximum(self._bounds(rows_a, rows_b), self.base_batch(a, xs, ys))
+
+_landmark_cache = weakref.WeakKeyDictionary()
+
+def landmark_heuristic(map, connectivity=4, num_landmarks=4, auto_refresh=True, refresh_after=LandmarkHeuristic.REFRESH_AFTER):
+    # One set of tables per map and settings, shared by every planner on it.
+    per_map = _landmark_cache.setdefault(map, {})
+    key = (connectivity, num_landmarks, auto_refresh, refresh_after)
+    if key not in per_map:
+        per_map[key] = LandmarkHeuristic(map, connectivity, num_landmarks, auto_refresh=auto_refresh,
+                                         refresh_after=refresh_after)
+    return per_map[key]
+
+def make_heuristic(heuristic, map, connectivity, **landmark_options):
+    # landmark_options (num_landmarks, auto_refresh, refresh_after) are passed on for 'alt'.
+    if heuristic == 'alt':
+        heuristic = landmark_heuristic(map, connectivity, **landmark_options)
+    if isinstance(heuristic, str):
+        return get_heuristic(heuristic, connectivity)
+    return heuristic, heuristic.batch
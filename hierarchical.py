@@ -0,0 +1,254 @@
+import heapq
+import numpy as np
+import batch_update
+import grid_graph
+from grid_graph import cell_cost
+from heuristics import distance_table, get_heuristic
+from planner_stats import PlannerStats
+from visited_cells import VisitedCells
+
+class HierarchicalPlanner:
+    # HPA*-style planner: the grid is split into cluster_size x cluster_size sectors, entrances are
+    # found along sector borders, and intra-sector distances between entrances are computed the first
+    # time a sector is searched and cached until one of its cells changes.
+    def __init__(self, map, s_start, s_goal, cluster_size=16, connectivity=4, headless=False):
+        self.map = map
+        self.s_start = s_start
+        self.s_goal = s_goal
+        self.cluster_size = cluster_size
+        self.connectivity = connectivity
+        self.headless = headless
+        self.heuristic = get_heuristic('auto', connectivity)[0]
+        self.stats = PlannerStats()
+        self.visited_nodes = VisitedCells(map.x_dim, map.y_dim)
+        self.path = []
+
+        self.clusters_x = (map.x_dim + cluster_size - 1) // cluster_size
+        self.clusters_y = (map.y_dim + cluster_size - 1) // cluster_size
+        self.border_edges = {}
+        self.inter = {}
+        self.intra = {}
+        for cx in range(self.clusters_x):
+            for cy in range(self.clusters_y):
+                if cx + 1 < self.clusters_x:
+                    self.build_border((cx, cy, 'x'))
+                if cy + 1 < self.clusters_y:
+                    self.build_border((cx, cy, 'y'))
+
+        if not self.headless:
+            print(f"Initializing HPA* with {self.clusters_x}x{self.clusters_y} clusters of size {cluster_size}")
+
+    def cluster_of(self, s):
+        return (s[0] // self.cluster_size, s[1] // self.cluster_size)
+
+    def cluster_bounds(self, cluster):
+        size = self.cluster_size
+        cx, cy = cluster
+        return cx * size, min((cx + 1) * size, self.map.x_dim), cy * size, min((cy + 1) * size, self.map.y_dim)
+
+    def cluster_nodes(self, cluster):
+        cx, cy = cluster
+        nodes = set()
+        for border in ((cx, cy, 'x'), (cx, cy, 'y'), (cx - 1, cy, 'x'), (cx, cy - 1, 'y')):
+            for a, _, _ in self.border_edges.get(border, ()):
+                nodes.add(a)
+        return {node for node in nodes if self.cluster_of(node) == cluster}
+
+    def build_border(self, border):
+        # Contiguous runs of cells that are free on both sides of the border get one entrance in the
+        # middle, or one at each end when the run is long.
+        for a, b, _ in self.border_edges.pop(border, ()):
+            self.inter.get(a, {}).pop(b, None)
+            self.inter.get(b, {}).pop(a, None)
+        cx, cy, axis = border
+        size = self.cluster_size
+        grid = self.map.grid
+        if axis == 'x':
+            x = (cx + 1) * size - 1
+            y0, y1 = cy * size, min((cy + 1) * size, self.map.y_dim)
+            open_pairs = (np.asarray(grid[x, y0:y1]) != -1) & (np.asarray(grid[x + 1, y0:y1]) != -1)
+            cells = [((x, y0 + i), (x + 1, y0 + i)) for i in range(y1 - y0)]
+        else:
+            y = (cy + 1) * size - 1
+            x0, x1 = cx * size, min((cx + 1) * size, self.map.x_dim)
+            open_pairs = (np.asarray(grid[x0:x1, y]) != -1) & (np.asarray(grid[x0:x1, y + 1]) != -1)
+            cells = [((x0 + i, y), (x0 + i, y + 1)) for i in range(x1 - x0)]
+        edges = []
+        run_start = None
+        for i, is_open in enumerate(list(open_pairs) + [False]):
+            if is_open and run_start is None:
+                run_start = i
+            elif not is_open and run_start is not None:
+                length = i - run_start
+                picks = [run_start + length // 2] if length < 6 else [run_start, i - 1]
+                for pick in picks:
+                    a, b = cells[pick]
+                    edges.append((a, b, cell_cost(grid[b])))
+                    edges.append((b, a, cell_cost(grid[a])))
+                run_start = None
+        self.border_edges[border] = edges
+        for a, b, cost in edges:
+            self.inter.setdefault(a, {})[b] = cost
+
+    def search_cluster(self, source, cluster, goal):
+        # Dijkstra restricted to one cluster, stopping at goal; used to refine abstract edges into cells.
+        x0, x1, y0, y1 = self.cluster_bounds(cluster)
+        dist = {source: 0.0}
+        parents = {source: None}
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            self.stats.expansions += 1
+            self.visited_nodes.append(u)
+            if u == goal:
+                break
+            for v, cost in grid_graph.successors(self.map, u, self.connectivity):
+                if not (x0 <= v[0] < x1 and y0 <= v[1] < y1):
+                    continue
+                new = d + cost
+                if new < dist.get(v, np.inf):
+                    dist[v] = new
+                    parents[v] = u
+                    heapq.heappush(heap, (new, v))
+        return parents
+
+    def cluster_distances(self, cluster, sources, reverse=False):
+        # Distance tables inside one cluster. Each source gets its own copy of the cluster's sub-grid,
+        # stacked with an obstacle row in between, so a single vectorized wavefront fills all tables
+        # and paths can't leave the cluster.
+        sources = list(sources)
+        x0, x1, y0, y1 = self.cluster_bounds(cluster)
+        grid = np.asarray(self.map.grid[x0:x1, y0:y1])
+        width = x1 - x0 + 1
+        separator = np.full((1, y1 - y0), -1, dtype=grid.dtype)
+        stacked = np.concatenate([grid, separator] * len(sources))
+        cells = [(k * width + s[0] - x0, s[1] - y0) for k, s in enumerate(sources)]
+        table = distance_table(stacked, cells, self.connectivity, reverse)
+        tables = {}
+        for k, source in enumerate(sources):
+            tables[source] = lambda cell, offset=k * width - x0: float(table[cell[0] + offset, cell[1] - y0])
+        return tables
+
+    def intra_edges(self, cluster):
+        edges = self.intra.get(cluster)
+        if edges is None:
+            nodes = self.cluster_nodes(cluster)
+            edges = {}
+            for node, dist in self.cluster_distances(cluster, nodes).items():
+                edges[node] = {other: dist(other) for other in nodes if other != node and dist(other) < np.inf}
+            self.intra[cluster] = edges
+        return edges
+
+    def precompute(self):
+        for cx in range(self.clusters_x):
+            for cy in range(self.clusters_y):
+                self.intra_edges((cx, cy))
+
+    def abstract_search(self, start, goal):
+        if self.map.grid[start] == -1 or self.map.grid[goal] == -1:
+            return None
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        start_dist = self.cluster_distances(start_cluster, [start])[start]
+        start_edges = {node: start_dist(node) for node in self.cluster_nodes(start_cluster) if start_dist(node) < np.inf}
+        goal_dist = self.cluster_distances(goal_cluster, [goal], reverse=True)[goal]
+        goal_edges = {node: goal_dist(node) for node in self.cluster_nodes(goal_cluster) if goal_dist(node) < np.inf}
+        if start_cluster == goal_cluster and start_dist(goal) < np.inf:
+            start_edges[goal] = start_dist(goal)
+
+        g = {start: 0.0}
+        parents = {start: None}
+        heap = [(self.heuristic(start, goal), 0.0, start)]
+        while heap:
+            _, g_u, u = heapq.heappop(heap)
+            if g_u > g[u]:
+                continue
+            self.stats.expansions += 1
+            if u == goal:
+                abstract_path = []
+                while u is not None:
+                    abstract_path.append(u)
+                    u = parents[u]
+                return abstract_path[::-1]
+            if u == start:
+                neighbors = list(start_edges.items())
+            else:
+                neighbors = list(self.intra_edges(self.cluster_of(u)).get(u, {}).items())
+            neighbors += list(self.inter.get(u, {}).items())
+            if u in goal_edges:
+                neighbors.append((goal, goal_edges[u]))
+            for v, cost in neighbors:
+                new = g_u + cost
+                if new < g.get(v, np.inf):
+                    g[v] = new
+                    parents[v] = u
+                    heapq.heappush(heap, (new + self.heuristic(v, goal), new, v))
+        return None
+
+    def refine(self, abstract_path):
+        path = [abstract_path[0]]
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            cluster = self.cluster_of(a)
+            if cluster != self.cluster_of(b):
+                path.append(b)
+                continue
+            parents = self.search_cluster(a, cluster, b)
+            segment = []
+            node = b
+            while node != a:
+                segment.append(node)
+                node = parents[node]
+            path.extend(reversed(segment))
+        return path
+
+    def compute_shortest_path(self, return_path=True):
+        with self.stats.timer('compute_shortest_path'):
+            abstract_path = self.abstract_search(self.s_start, self.s_goal)
+        self.stats.replans += 1
+        with self.stats.timer('extract_path'):
+            self.path = self.refine(abstract_path) if abstract_path else []
+        if not self.path and not self.headless:
+            print("Path blocked or goal unreachable.")
+        return self.path if return_path else None
+
+    def extract_path(self):
+        return self.path
+
+    def move_and_replan(self, robot_position):
+        self.s_start = robot_position
+        return self.compute_shortest_path(), self.visited_nodes
+
+    def apply_changes(self, changes, replan=True):
+        cells, costs = batch_update.split_changes(changes)
+        if len(cells) == 0:
+            return (self.compute_shortest_path() if replan else None), 0
+        self.map.set_costs(cells[:, 0], cells[:, 1], costs)
+        size = self.cluster_size
+        borders = set()
+        clusters = set()
+        for x, y in cells.tolist():
+            cx, cy = x // size, y // size
+            clusters.add((cx, cy))
+            if x % size == size - 1 and cx + 1 < self.clusters_x:
+                borders.add((cx, cy, 'x'))
+            if x % size == 0 and cx > 0:
+                borders.add((cx - 1, cy, 'x'))
+            if y % size == size - 1 and cy + 1 < self.clusters_y:
+                borders.add((cx, cy, 'y'))
+            if y % size == 0 and cy > 0:
+                borders.add((cx, cy - 1, 'y'))
+        for border in borders:
+            self.build_border(border)
+            cx, cy, axis = border
+            clusters.add((cx, cy))
+            clusters.add((cx + 1, cy) if axis == 'x' else (cx, cy + 1))
+        # Only the touched sectors (and neighbors sharing a rebuilt border) lose their cached edges.
+        for cluster in clusters:
+            self.intra.pop(cluster, None)
+        path = self.compute_shortest_path() if replan else None
+        return path, len(clusters)
+
+    def modify_cost(self, X, Y, new_cost):
+        self.apply_changes([((X, Y), new_cost)], replan=False)
@@ -0,0 +1,206 @@
+import heapq
+import numpy as np
+import batch_update
+from grid_graph import SQRT2
+from heuristics import get_heuristic
+from planner_stats import PlannerStats
+from visited_cells import VisitedCells
+
+UNKNOWN = 2  # walkable value of a cell whose tile has not been read yet
+
+def is_uniform_cost(grid):
+    # JPS prunes on the assumption that every free cell costs the same to enter (0 and 1 both cost 1).
+    grid = np.asarray(grid)
+    return bool(np.all(grid <= 1))
+
+class JumpPointSearch:
+    # Jump Point Search (Harabor & Grastien) on uniform-cost grids. connectivity=4 follows PathFinding.js'
+    # "never diagonal" variant, connectivity=8 its "only when no obstacles" variant, which matches the
+    # no-corner-cutting rule of the other planners.
+    TILE_SIZE = 256
+
+    def __init__(self, map, s_start, s_goal, connectivity=4, headless=False):
+        if connectivity not in (4, 8):
+            raise ValueError(f"connectivity must be 4 or 8, got {connectivity}")
+        self.map = map
+        self.s_start = s_start
+        self.s_goal = s_goal
+        self.connectivity = connectivity
+        self.headless = headless
+        self.heuristic = get_heuristic('auto', connectivity)[0]
+        self.stats = PlannerStats()
+        self.visited_nodes = VisitedCells(map.x_dim, map.y_dim)
+        self.path = []
+        # One bytearray row per grid row, plus a blocked ring around the grid so jumps never need a bounds check:
+        # 1 free, 0 blocked, UNKNOWN until the cell's tile is first read. Kept across searches and patched by
+        # apply_changes, so only the tiles a search reaches are ever read from the map.
+        self.tile_size = getattr(map.grid, 'tile_size', self.TILE_SIZE)
+        row = bytearray([0]) + bytearray([UNKNOWN]) * map.y_dim + bytearray([0])
+        self.walkable = [bytearray(map.y_dim + 2)] + [bytearray(row) for _ in range(map.x_dim)] + [bytearray(map.y_dim + 2)]
+
+        if not self.headless:
+            print(f"Initializing JPS with start: {s_start}, goal: {s_goal}, map size: {map.x_dim}x{map.y_dim}")
+
+    def load_tile(self, x, y):
+        size = self.tile_size
+        x0, y0 = x - x % size, y - y % size
+        x1, y1 = min(x0 + size, self.map.x_dim), min(y0 + size, self.map.y_dim)
+        block = np.asarray(self.map.grid[x0:x1, y0:y1])
+        if not is_uniform_cost(block):
+            raise ValueError("Jump Point Search needs a uniform-cost grid (all free cells <= 1)")
+        for row, values in zip(self.walkable[x0 + 1:x1 + 1], (block != -1).astype(np.uint8)):
+            row[y0 + 1:y1 + 1] = values.tobytes()
+
+    def free(self, x, y):
+        value = self.walkable[x + 1][y + 1]
+        if value == UNKNOWN:
+            self.load_tile(x, y)
+            value = self.walkable[x + 1][y + 1]
+        return value
+
+    def jump_straight(self, x, y, dx, dy):
+        free = self.free
+        goal = self.s_goal
+        while free(x, y):
+            self.visited_nodes.append((x, y))
+            if (x, y) == goal:
+                return (x, y)
+            if dx != 0:
+                if (free(x, y - 1) and not free(x - dx, y - 1)) or (free(x, y + 1) and not free(x - dx, y + 1)):
+                    return (x, y)
+            else:
+                if (free(x - 1, y) and not free(x - 1, y - dy)) or (free(x + 1, y) and not free(x + 1, y - dy)):
+                    return (x, y)
+                if self.connectivity == 4 and (self.jump_straight(x + 1, y, 1, 0) or self.jump_straight(x - 1, y, -1, 0)):
+                    return (x, y)
+            x += dx
+            y += dy
+        return None
+
+    def jump_diagonal(self, x, y, dx, dy):
+        free = self.free
+        while free(x, y):
+            self.visited_nodes.append((x, y))
+            if (x, y) == self.s_goal:
+                return (x, y)
+            if self.jump_straight(x + dx, y, dx, 0) or self.jump_straight(x, y + dy, 0, dy):
+                return (x, y)
+            if not (free(x + dx, y) and free(x, y + dy)):
+                return None
+            x += dx
+            y += dy
+        return None
+
+    def pruned_neighbors(self, node, parent):
+        free = self.free
+        x, y = node
+        if parent is None:
+            directions = [(dx, dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)) if free(x + dx, y + dy)]
+            if self.connectivity == 8:
+                directions += [(dx, dy) for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1))
+                               if free(x + dx, y) and free(x, y + dy) and free(x + dx, y + dy)]
+            return directions
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        if self.connectivity == 4:
+            return [(0, -1), (0, 1), (dx, 0)] if dx != 0 else [(-1, 0), (1, 0), (0, dy)]
+        if dx != 0 and dy != 0:
+            directions = [(0, dy), (dx, 0)]
+            if free(x + dx, y) and free(x, y + dy):
+                directions.append((dx, dy))
+            return directions
+        if dx != 0:
+            directions = [(dx, 0), (0, 1), (0, -1)]
+            if free(x + dx, y):
+                directions += [(dx, side) for side in (1, -1) if free(x, y + side)]
+        else:
+            directions = [(0, dy), (1, 0), (-1, 0)]
+            if free(x, y + dy):
+                directions += [(side, dy) for side in (1, -1) if free(x + side, y)]
+        return directions
+
+    def distance(self, a, b):
+        dx = abs(a[0] - b[0])
+        dy = abs(a[1] - b[1])
+        return max(dx, dy) + (SQRT2 - 1) * min(dx, dy)
+
+    def search(self):
+        start, goal = self.s_start, self.s_goal
+        if not (self.free(*start) and self.free(*goal)):
+            return None
+        g = {start: 0.0}
+        parents = {start: None}
+        heap = [(self.heuristic(start, goal), 0.0, start)]
+        while heap:
+            _, g_u, u = heapq.heappop(heap)
+            if g_u > g[u]:
+                continue
+            self.stats.expansions += 1
+            if u == goal:
+                jump_points = []
+                while u is not None:
+                    jump_points.append(u)
+                    u = parents[u]
+                return jump_points[::-1]
+            for dx, dy in self.pruned_neighbors(u, parents[u]):
+                if dx != 0 and dy != 0:
+                    v = self.jump_diagonal(u[0] + dx, u[1] + dy, dx, dy)
+                else:
+                    v = self.jump_straight(u[0] + dx, u[1] + dy, dx, dy)
+                if v is None:
+                    continue
+                new = g_u + self.distance(u, v)
+                if new < g.get(v, np.inf):
+                    g[v] = new
+                    parents[v] = u
+                    self.stats.heap_pushes += 1
+                    heapq.heappush(heap, (new + self.heuristic(v, goal), new, v))
+        return None
+
+    def expand_path(self, jump_points):
+        # Jump points are joined by straight or diagonal runs; fill in the cells between them.
+        path = [jump_points[0]]
+        for (x0, y0), (x1, y1) in zip(jump_points, jump_points[1:]):
+            dx = (x1 > x0) - (x1 < x0)
+            dy = (y1 > y0) - (y1 < y0)
+            x, y = x0, y0
+            while (x, y) != (x1, y1):
+                x += dx if x != x1 else 0
+                y += dy if y != y1 else 0
+                path.append((x, y))
+        return path
+
+    def compute_shortest_path(self, return_path=True):
+        with self.stats.timer('compute_shortest_path'):
+            jump_points = self.search()
+        self.stats.replans += 1
+        with self.stats.timer('extract_path'):
+            self.path = self.expand_path(jump_points) if jump_points else []
+        if not self.path and not self.headless:
+            print("Path blocked or goal unreachable.")
+        return self.path if return_path else None
+
+    def extract_path(self):
+        return self.path
+
+    def move_and_replan(self, robot_position):
+        self.s_start = robot_position
+        return self.compute_shortest_path(), self.visited_nodes
+
+    def apply_changes(self, changes, replan=True):
+        # JPS keeps no search state between calls; changes only take effect on the next search.
+        cells, costs = batch_update.split_changes(changes)
+        if len(cells):
+            if not is_uniform_cost(costs):
+                raise ValueError("Jump Point Search needs a uniform-cost grid (all free cells <= 1)")
+            self.map.set_costs(cells[:, 0], cells[:, 1], costs)
+            # Cells of tiles not read yet stay unknown and are read with their tile.
+            walkable = self.walkable
+            for (x, y), cost in zip(cells.tolist(), costs.tolist()):
+                if walkable[x + 1][y + 1] != UNKNOWN:
+                    walkable[x + 1][y + 1] = cost != -1
+        path = self.compute_shortest_path() if replan else None
+        return path, len(cells)
+
+    def modify_cost(self, X, Y, new_cost):
+        self.apply_changes([((X, Y), new_cost)], replan=False)
@@ -1,20 +1,46 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import multiprocessing.util
+import os
 import random
-import tkinter as tk
-from main_d_Star import MainApplicationDStar
-from main_d_Lite import MainApplicationDStarLite
-import yaml
+import subprocess
+import sys
+from occupancy_grid import make_world
+from d_star import DStar
+from d_star_lite import DStarLite
+from hierarchical import HierarchicalPlanner
+from jps import JumpPointSearch
+from planner_stats import PlannerStats
+from memory_profile import MemoryProfiler
 import numpy as np
 import time
-import psutil
+
+# tkinter, pygame (through gui and the MainApplication modules), yaml and psutil are imported where they are
+# used, so the headless benchmark and the planners start with NumPy alone.
+GUI_MODULES = ('tkinter', 'pygame', 'yaml', 'psutil')
+STARTUP_MODULES = ('main_benchmark', 'd_star', 'd_star_lite', 'map_loader', 'simulation')
+
+PLANNERS = {
+    'D_star': DStar,
+    'D_star_Lite': DStarLite,
+    'HPA_star': HierarchicalPlanner,
+    'JPS': JumpPointSearch,
+}
 
 class Benchmark:
     def __init__(self, headless=False):
-        self.root = tk.Tk()
+        if not headless:
+            import tkinter as tk
+        self.root = tk.Tk() if not headless else None
         self.min_window_size = 480
         self.max_window_size = 1080
         self.headless = headless
 
     def run_benchmark(self):
+        from main_d_Star import MainApplicationDStar
+        from main_d_Lite import MainApplicationDStarLite
         random_seed = random.randint(0, 10000)
         random.seed(random_seed)
         np.random.seed(random_seed)
@@ -36,6 +62,8 @@ class Benchmark:
         self.run_algorithm(MainApplicationDStarLite, 'D_star_Lite', start, goal, grid_size, random_seed)
 
     def run_algorithm(self, algorithm_class, algorithm_name, start, goal, grid_size, random_seed):
+        import psutil
+        import yaml
         process = psutil.Process()
         start_time = time.time()
         app = algorithm_class(self.root, start, goal, grid_size, random_seed, headless=self.headless)
@@ -43,8 +71,12 @@ class Benchmark:
         elapsed_time = end_time - start_time
         memory_usage = process.memory_info().rss / (1024 * 1024)
 
+        planner_name = algorithm_name
         if algorithm_name == 'D_star':
             path, visited_nodes = app.dstar.extract_path(), app.dstar.visited_nodes
+        elif app.last_plan is not None:
+            # The first plan on a uniform-cost map comes from JPS, with D* Lite not searched yet.
+            planner_name, path, visited_nodes = app.last_plan
         else:
             path, visited_nodes = app.dstar_lite.extract_path(), app.dstar_lite.visited_nodes
 
@@ -52,6 +84,7 @@ class Benchmark:
 
         results = {
             'algorithm': algorithm_name,
+            'planner': planner_name,
             'random_seed': random_seed,
             'window_size': [app.gui.width, app.gui.height] if not self.headless else [0, 0],
             'grid_size': [app.x_dim, app.y_dim],
@@ -70,6 +103,312 @@ class Benchmark:
             yaml.dump(results, file)
         print(f"Results for {algorithm_name} saved to YAML file.")
 
+class HeadlessBenchmark:
+    def __init__(self, algorithms=None, grid_sizes=(50,), densities=(0.2,), seeds=(0,), repeat=3, warmup=1, replans=5, replan_step=3, cost_dtype='float64', connectivity=4, heuristic='auto', memory=False):
+        self.algorithms = list(algorithms or PLANNERS)
+        self.grid_sizes = grid_sizes
+        self.densities = densities
+        self.seeds = seeds
+        self.repeat = repeat
+        self.warmup = warmup
+        self.replans = replans
+        self.replan_step = replan_step
+        self.cost_dtype = cost_dtype
+        self.connectivity = connectivity
+        self.heuristic = heuristic
+        # tracemalloc slows the planners down, so times from memory runs are only comparable with each other.
+        self.memory = memory
+
+    def run_trial(self, algorithm_name, grid_size, density, seed):
+        map, start, goal, _ = make_world(grid_size, density, seed)
+        planner_class = PLANNERS[algorithm_name]
+        options = {'connectivity': self.connectivity}
+        if planner_class in (DStar, DStarLite):
+            options.update(random_obstacles=False, cost_dtype=np.dtype(self.cost_dtype), heuristic=self.heuristic)
+        planner = planner_class(map=map, s_start=start, s_goal=goal, headless=True, **options)
+        profiler = MemoryProfiler(planner).start() if self.memory else None
+
+        t0 = time.perf_counter()
+        planner.compute_shortest_path(return_path=False)
+        plan_time = time.perf_counter() - t0
+        if profiler is not None:
+            profiler.end()
+        initial_expansions = planner.stats.expansions
+
+        t0 = time.perf_counter()
+        path = planner.extract_path()
+        extract_times = [time.perf_counter() - t0]
+
+        replan_times = []
+        for _ in range(self.replans):
+            if len(path) <= self.replan_step + 2 or path[-1] != goal or (hasattr(planner, 'g') and planner.g[path[0]] == np.inf):
+                break
+            position = path[self.replan_step]
+            blocked = path[self.replan_step + 1]
+            if blocked == goal:
+                break
+            t0 = time.perf_counter()
+            planner.s_start = position
+            planner.apply_changes([(blocked, -1)], replan=False)
+            planner.compute_shortest_path(return_path=False)
+            replan_times.append(time.perf_counter() - t0)
+            if profiler is not None:
+                profiler.end()
+
+            t0 = time.perf_counter()
+            path = planner.extract_path()
+            extract_times.append(time.perf_counter() - t0)
+
+        row = {
+            'algorithm': algorithm_name,
+            'grid_size': grid_size,
+            'density': density,
+            'connectivity': self.connectivity,
+            'heuristic': self.heuristic,
+            'seed': seed,
+            'start_node': list(start),
+            'goal_node': list(goal),
+            'num_obstacles_total': int(np.sum(map.grid == -1)),
+            'plan_time': plan_time,
+            'replan_count': len(replan_times),
+            'replan_time_total': float(np.sum(replan_times)),
+            'replan_time_max': float(np.max(replan_times)) if replan_times else 0.0,
+            'extract_time_total': float(np.sum(extract_times)),
+            'initial_expansions': initial_expansions,
+            'num_visited_nodes': len(planner.visited_nodes),
+            'num_nodes_shortest_path': len(path),
+        }
+        for name in PlannerStats.COUNTERS:
+            row[name] = getattr(planner.stats, name)
+        if profiler is not None:
+            profiler.stop()
+            # Record 0 is the initial search; the structure peaks cover every search.
+            row['plan_traced_peak'] = profiler.records[0]['traced_peak']
+            row['replan_traced_peak'] = profiler.peaks(profiler.records[1:])['traced_peak']
+            for name, size in profiler.peaks().items():
+                if name != 'traced_peak':
+                    row[f'{name[:-len("_bytes")]}_peak_bytes'] = size
+        return row
+
+    def settings(self):
+        return {
+            'algorithms': self.algorithms,
+            'grid_sizes': self.grid_sizes,
+            'densities': self.densities,
+            'seeds': self.seeds,
+            'repeat': self.repeat,
+            'warmup': self.warmup,
+            'replans': self.replans,
+            'replan_step': self.replan_step,
+            'cost_dtype': self.cost_dtype,
+            'connectivity': self.connectivity,
+            'heuristic': self.heuristic,
+            'memory': self.memory,
+        }
+
+    def tasks(self):
+        for grid_size in self.grid_sizes:
+            for density in self.densities:
+                for algorithm_name in self.algorithms:
+                    for seed in self.seeds:
+                        for trial in range(self.repeat):
+                            yield algorithm_name, grid_size, density, seed, trial
+
+    def run(self, emit=None):
+        rows = []
+        warmed_up = set()
+        for algorithm_name, grid_size, density, seed, trial in self.tasks():
+            if (algorithm_name, grid_size, density) not in warmed_up:
+                warmed_up.add((algorithm_name, grid_size, density))
+                for _ in range(self.warmup):
+                    self.run_trial(algorithm_name, grid_size, density, seed)
+            row = self.run_trial(algorithm_name, grid_size, density, seed)
+            row['trial'] = trial
+            rows.append(row)
+            if emit is not None:
+                emit(row)
+        return rows
+
+    def run_parallel(self, workers=None, cpus=None, emit=None, start_method=None):
+        # Every trial gets a fresh worker process (maxtasksperchild=1), so its memory figures
+        # are not inflated by earlier trials. Each worker takes a cpu nobody else holds from a shared
+        # queue when it starts and hands it back when it exits, so no two trials share a cpu.
+        if cpus is None and hasattr(os, 'sched_getaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+        if workers is None:
+            workers = len(cpus) if cpus else (os.cpu_count() or 1)
+        if cpus:
+            workers = min(workers, len(cpus))
+        settings = self.settings()
+        jobs = [(settings, task) for task in self.tasks()]
+        context = multiprocessing.get_context(start_method)
+        free_cpus = None
+        if cpus and hasattr(os, 'sched_setaffinity'):
+            free_cpus = context.SimpleQueue()
+            for cpu in cpus:
+                free_cpus.put(cpu)
+        rows = []
+        with context.Pool(processes=workers, maxtasksperchild=1, initializer=_pin_worker, initargs=(free_cpus,)) as pool:
+            for row in pool.imap_unordered(_run_isolated_trial, jobs):
+                rows.append(row)
+                if emit is not None:
+                    emit(row)
+        rows.sort(key=lambda row: (row['grid_size'], row['density'], row['algorithm'], row['seed'], row['trial']))
+        return rows
+
+_worker_cpu = None
+
+def _pin_worker(free_cpus):
+    global _worker_cpu
+    if free_cpus is None:
+        return
+    # Blocks until a worker that has finished its trial exits and gives its cpu back.
+    _worker_cpu = free_cpus.get()
+    os.sched_setaffinity(0, {_worker_cpu})
+    multiprocessing.util.Finalize(None, free_cpus.put, args=(_worker_cpu,), exitpriority=10)
+
+def _run_isolated_trial(job):
+    settings, (algorithm_name, grid_size, density, seed, trial) = job
+    cpu = _worker_cpu
+    import psutil
+    benchmark = HeadlessBenchmark(**settings)
+    for _ in range(benchmark.warmup):
+        benchmark.run_trial(algorithm_name, grid_size, density, seed)
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    row = benchmark.run_trial(algorithm_name, grid_size, density, seed)
+    rss_after = process.memory_info().rss
+    row['trial'] = trial
+    row['cpu'] = cpu
+    row['memory_usage'] = rss_after / (1024 * 1024)
+    row['memory_growth'] = (rss_after - rss_before) / (1024 * 1024)
+    return row
+
+def summarize(rows, metrics=('plan_time', 'replan_time_total', 'extract_time_total')):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['algorithm'], row['grid_size'], row['density']), []).append(row)
+    summary = []
+    for (algorithm_name, grid_size, density), group in sorted(groups.items()):
+        entry = {'algorithm': algorithm_name, 'grid_size': grid_size, 'density': density, 'trials': len(group)}
+        for metric in metrics:
+            values = np.array([row[metric] for row in group], dtype=float)
+            entry[f'{metric}_min'] = float(values.min())
+            entry[f'{metric}_median'] = float(np.median(values))
+            entry[f'{metric}_p95'] = float(np.percentile(values, 95))
+        summary.append(entry)
+    return summary
+
+def measure_startup(modules=STARTUP_MODULES, repeat=5):
+    # Import time of each module in a fresh interpreter (interpreter start-up itself excluded), and which
+    # GUI or metrics modules the import dragged in.
+    code = ("import json, sys, time; start = time.perf_counter(); import {module}; "
+            "print(json.dumps([time.perf_counter() - start, [name for name in {heavy!r} if name in sys.modules]]))")
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in modules:
+        times = []
+        loaded = set()
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', code.format(module=module, heavy=GUI_MODULES)], cwd=directory,
+                                    capture_output=True, text=True, check=True).stdout
+            seconds, heavy = json.loads(output.strip().splitlines()[-1])
+            times.append(seconds)
+            loaded.update(heavy)
+        results.append({
+            'module': module,
+            'trials': repeat,
+            'import_time_min': float(np.min(times)),
+            'import_time_median': float(np.median(times)),
+            'gui_modules_loaded': sorted(loaded),
+        })
+    return results
+
+class RowWriter:
+    def __init__(self, file, format):
+        self.file = file
+        self.format = format
+        self.writer = None
+
+    def __call__(self, row):
+        if self.format == 'json':
+            self.file.write(json.dumps(row) + '\n')
+        else:
+            if self.writer is None:
+                self.writer = csv.DictWriter(self.file, fieldnames=list(row))
+                self.writer.writeheader()
+            self.writer.writerow(row)
+        self.file.flush()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark DStar and DStarLite planning phases.")
+    parser.add_argument('--gui', action='store_true', help="run the original single-seed GUI benchmark")
+    parser.add_argument('--algorithms', nargs='+', choices=list(PLANNERS), default=list(PLANNERS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[50, 100])
+    parser.add_argument('--densities', nargs='+', type=float, default=[0.1, 0.2])
+    parser.add_argument('--seeds', type=int, default=5, help="number of seeds, starting at --first-seed")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--replans', type=int, default=5)
+    parser.add_argument('--cost-dtype', choices=['float32', 'float64'], default='float64', help="dtype of the planners' g/rhs arrays")
+    parser.add_argument('--connectivity', type=int, choices=[4, 8], default=4)
+    parser.add_argument('--heuristic', choices=['auto', 'manhattan', 'octile', 'euclidean', 'zero', 'alt'], default='auto')
+    parser.add_argument('--workers', type=int, default=0, help="worker processes, one fresh process per trial; 0 runs serially in-process")
+    parser.add_argument('--cpus', default=None, help="comma separated cpu ids to pin workers to, e.g. 0,1,2,3")
+    parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'], default=None)
+    parser.add_argument('--format', choices=['json', 'csv'], default='json')
+    parser.add_argument('--output', default='-', help="file for per-trial rows, '-' for stdout")
+    parser.add_argument('--summary', default=None, help="optional JSON file for min/median/p95 summary")
+    parser.add_argument('--memory', action='store_true', help="trace per-structure peak bytes with tracemalloc; slows the timed phases")
+    parser.add_argument('--startup-repeat', type=int, default=5, help="fresh interpreters per module for import timing; 0 skips it")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.gui:
+        benchmark = Benchmark(headless=False)
+        benchmark.run_benchmark()
+        return
+
+    benchmark = HeadlessBenchmark(algorithms=args.algorithms,
+                                  grid_sizes=args.sizes,
+                                  densities=args.densities,
+                                  seeds=list(range(args.first_seed, args.first_seed + args.seeds)),
+                                  repeat=args.repeat,
+                                  warmup=args.warmup,
+                                  replans=args.replans,
+                                  cost_dtype=args.cost_dtype,
+                                  connectivity=args.connectivity,
+                                  heuristic=args.heuristic,
+                                  memory=args.memory)
+    file = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        writer = RowWriter(file, args.format)
+        if args.workers or args.cpus:
+            cpus = [int(cpu) for cpu in args.cpus.split(',')] if args.cpus else None
+            rows = benchmark.run_parallel(workers=args.workers or None, cpus=cpus, emit=writer, start_method=args.start_method)
+        else:
+            rows = benchmark.run(emit=writer)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+    summary = summarize(rows)
+    for entry in summary:
+        print(f"{entry['algorithm']} {entry['grid_size']}x{entry['grid_size']} density {entry['density']}: "
+              f"plan min {entry['plan_time_min']:.4f}s median {entry['plan_time_median']:.4f}s p95 {entry['plan_time_p95']:.4f}s, "
+              f"replan median {entry['replan_time_total_median']:.4f}s", file=sys.stderr)
+    if args.startup_repeat:
+        startup = measure_startup(repeat=args.startup_repeat)
+        for entry in startup:
+            loaded = ', '.join(entry['gui_modules_loaded']) or 'none'
+            print(f"import {entry['module']}: min {entry['import_time_min']:.4f}s median {entry['import_time_median']:.4f}s, "
+                  f"GUI/metrics modules loaded: {loaded}", file=sys.stderr)
+        summary.extend(startup)
+    if args.summary:
+        with open(args.summary, 'w') as file:
+            json.dump(summary, file, indent=2)
+
 if __name__ == "__main__":
-    benchmark = Benchmark(headless=False)  # Set headless to True for no GUI
-    benchmark.run_benchmark()
+    main()
@@ -1,11 +1,10 @@
 import random
 import numpy as np
-import tkinter as tk
-from gui import Animation, OccupancyGridMap
+from occupancy_grid import OccupancyGridMap
 from d_star_lite import DStarLite
+from jps import JumpPointSearch, is_uniform_cost
 from slam import SLAM
 import time
-import psutil
 from display_window import DisplayWindow
 
 class MainApplicationDStarLite:
@@ -34,6 +33,8 @@ class MainApplicationDStarLite:
             np.random.seed(random_seed)
 
         if not self.headless:
+            # pygame (through gui) and psutil are only loaded for interactive runs.
+            from gui import Animation
             self.gui = Animation(title="D* Lite Path Planning",
                                  width=window_width,
                                  height=window_height,
@@ -49,22 +50,27 @@ class MainApplicationDStarLite:
 
         self.new_position = self.start
         self.last_position = self.start
+        self.planned = False
+        # (planner name, path, visited cells) of the most recent plan; the first one may come from JPS.
+        self.last_plan = None
 
         print(f"Start: {self.start}, Goal: {self.goal}, Grid Size: {self.x_dim}x{self.y_dim}")
 
         self.dstar_lite = DStarLite(map=self.new_map, s_start=self.start, s_goal=self.goal, headless=self.headless)
 
         if not self.headless:
-            self.slam = SLAM(map=self.new_map, view_range=self.view_range)
+            self.slam = SLAM(map=self.new_map, view_range=self.view_range, planner=self.dstar_lite)
 
         self.start_time = time.time()
-        self.process = psutil.Process()
+        if not self.headless:
+            import psutil
+            self.process = psutil.Process()
 
     def update_gui(self):
         start_time = time.time()
         print(f"Updating GUI at time: {start_time}")
 
-        path, visited_nodes = self.dstar_lite.move_and_replan(robot_position=self.new_position)
+        path, visited_nodes = self.plan()
         print(f"Path after replanning: {path}")
 
         end_time = time.time()
@@ -77,6 +83,22 @@ class MainApplicationDStarLite:
 
             self.gui.run_game(path=path, visited_nodes=visited_nodes)
 
+    def plan(self):
+        # Nothing has changed before the first plan, so on a uniform-cost map JPS finds it much faster;
+        # D* Lite is left untouched and runs its first search only when a replan is needed.
+        if not self.planned:
+            self.planned = True
+            if is_uniform_cost(self.new_map.grid):
+                jps = JumpPointSearch(map=self.new_map, s_start=self.new_position, s_goal=self.goal,
+                                      connectivity=self.dstar_lite.connectivity, headless=self.headless)
+                path, visited_nodes = jps.move_and_replan(robot_position=self.new_position)
+                if path:
+                    self.last_plan = ('JPS', path, visited_nodes)
+                    return path, visited_nodes
+        path, visited_nodes = self.dstar_lite.move_and_replan(robot_position=self.new_position)
+        self.last_plan = ('D_star_Lite', path, visited_nodes)
+        return path, visited_nodes
+
     def goal_reached(self):
         current_position = self.new_position
         goal_position = self.goal
@@ -1,11 +1,9 @@
 import random
 import numpy as np
-import tkinter as tk
-from gui import Animation, OccupancyGridMap
+from occupancy_grid import OccupancyGridMap
 from d_star import DStar
 from slam import SLAM
 import time
-import psutil
 from display_window import DisplayWindow
 
 class MainApplicationDStar:
@@ -34,6 +32,8 @@ class MainApplicationDStar:
             np.random.seed(random_seed)
 
         if not self.headless:
+            # pygame (through gui) and psutil are only loaded for interactive runs.
+            from gui import Animation
             self.gui = Animation(title="D* Path Planning",
                                  width=window_width,
                                  height=window_height,
@@ -55,10 +55,12 @@ class MainApplicationDStar:
         self.dstar = DStar(map=self.new_map, s_start=self.start, s_goal=self.goal, headless=self.headless)
 
         if not self.headless:
-            self.slam = SLAM(map=self.new_map, view_range=self.view_range)
+            self.slam = SLAM(map=self.new_map, view_range=self.view_range, planner=self.dstar)
 
         self.start_time = time.time()
-        self.process = psutil.Process()
+        if not self.headless:
+            import psutil
+            self.process = psutil.Process()
 
     def update_gui(self):
         start_time = time.time()
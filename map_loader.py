@@ -0,0 +1,174 @@
+import os
+import numpy as np
+from occupancy_grid import OccupancyGridMap
+
+class TiledGrid:
+    tiled = True
+
+    def __init__(self, source, to_occupancy, tile_size=256, dtype=np.int8):
+        self.source = source
+        self.to_occupancy = to_occupancy
+        self.tile_size = tile_size
+        self.dtype = np.dtype(dtype)
+        self.shape = source.shape
+        self.ndim = 2
+        self.tiles = {}
+
+    @property
+    def loaded_tiles(self):
+        return len(self.tiles)
+
+    def tile(self, tx, ty):
+        tile = self.tiles.get((tx, ty))
+        if tile is None:
+            size = self.tile_size
+            block = np.asarray(self.source[tx * size:(tx + 1) * size, ty * size:(ty + 1) * size])
+            tile = np.ascontiguousarray(self.to_occupancy(block), dtype=self.dtype)
+            self.tiles[(tx, ty)] = tile
+        return tile
+
+    def _check(self, x, y):
+        if not (0 <= x < self.shape[0] and 0 <= y < self.shape[1]):
+            raise IndexError(f"cell {(x, y)} is outside of grid with shape {self.shape}")
+
+    def _slice_bounds(self, key, axis):
+        start, stop, step = key.indices(self.shape[axis])
+        if step != 1:
+            raise IndexError("TiledGrid only supports contiguous slices")
+        return start, max(start, stop)
+
+    def _split_key(self, key):
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        if len(key) != 2:
+            raise IndexError("TiledGrid is two-dimensional")
+        return key
+
+    def __getitem__(self, key):
+        x, y = self._split_key(key)
+        size = self.tile_size
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            self._check(x, y)
+            return self.tile(x // size, y // size)[x % size, y % size]
+        if isinstance(x, (int, np.integer)) and isinstance(y, slice):
+            return self[x:x + 1, y][0]
+        if isinstance(x, slice) and isinstance(y, (int, np.integer)):
+            return self[x, y:y + 1][:, 0]
+        if isinstance(x, slice) and isinstance(y, slice):
+            x0, x1 = self._slice_bounds(x, 0)
+            y0, y1 = self._slice_bounds(y, 1)
+            out = np.empty((x1 - x0, y1 - y0), dtype=self.dtype)
+            for tx in range(x0 // size, (x1 - 1) // size + 1 if x1 > x0 else x0 // size):
+                for ty in range(y0 // size, (y1 - 1) // size + 1 if y1 > y0 else y0 // size):
+                    tile = self.tile(tx, ty)
+                    ax0, ax1 = max(x0, tx * size), min(x1, (tx + 1) * size)
+                    ay0, ay1 = max(y0, ty * size), min(y1, (ty + 1) * size)
+                    out[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = tile[ax0 - tx * size:ax1 - tx * size, ay0 - ty * size:ay1 - ty * size]
+            return out
+        xs, ys = np.broadcast_arrays(np.asarray(x, dtype=np.intp), np.asarray(y, dtype=np.intp))
+        out = np.empty(xs.shape, dtype=self.dtype)
+        for (tx, ty), mask in self._group_by_tile(xs, ys):
+            out[mask] = self.tile(tx, ty)[xs[mask] - tx * size, ys[mask] - ty * size]
+        return out
+
+    def __setitem__(self, key, value):
+        x, y = self._split_key(key)
+        size = self.tile_size
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            self._check(x, y)
+            self.tile(x // size, y // size)[x % size, y % size] = value
+            return
+        if isinstance(x, slice) or isinstance(y, slice):
+            x0, x1 = self._slice_bounds(x, 0) if isinstance(x, slice) else (x, x + 1)
+            y0, y1 = self._slice_bounds(y, 1) if isinstance(y, slice) else (y, y + 1)
+            xs, ys = np.meshgrid(np.arange(x0, x1), np.arange(y0, y1), indexing='ij')
+            # As in numpy, an integer index drops its axis from the shape the value is broadcast to.
+            shape = tuple(stop - start for key, (start, stop) in ((x, (x0, x1)), (y, (y0, y1))) if isinstance(key, slice))
+            value = np.broadcast_to(np.asarray(value), shape).reshape(xs.shape)
+        else:
+            xs, ys = np.broadcast_arrays(np.asarray(x, dtype=np.intp), np.asarray(y, dtype=np.intp))
+        value = np.broadcast_to(np.asarray(value), xs.shape)
+        for (tx, ty), mask in self._group_by_tile(xs, ys):
+            self.tile(tx, ty)[xs[mask] - tx * size, ys[mask] - ty * size] = value[mask]
+
+    def _group_by_tile(self, xs, ys):
+        if xs.size and (xs.min() < 0 or ys.min() < 0 or xs.max() >= self.shape[0] or ys.max() >= self.shape[1]):
+            raise IndexError(f"index out of bounds for grid with shape {self.shape}")
+        tx = xs // self.tile_size
+        ty = ys // self.tile_size
+        for tile_x, tile_y in set(zip(tx.ravel().tolist(), ty.ravel().tolist())):
+            yield (tile_x, tile_y), (tx == tile_x) & (ty == tile_y)
+
+    def __array__(self, dtype=None, copy=None):
+        grid = self[:, :]
+        return grid if dtype is None else grid.astype(dtype)
+
+    def __eq__(self, other):
+        return np.asarray(self) == other
+
+    def __ne__(self, other):
+        return np.asarray(self) != other
+
+def _read_pgm_header(path):
+    with open(path, 'rb') as file:
+        data = file.read(4096)
+    tokens = []
+    index = 0
+    while len(tokens) < 4:
+        while data[index:index + 1].isspace():
+            index += 1
+        if data[index:index + 1] == b'#':
+            while data[index:index + 1] not in (b'\n', b'\r'):
+                index += 1
+            continue
+        start = index
+        while not data[index:index + 1].isspace():
+            index += 1
+        tokens.append(data[start:index])
+    if tokens[0] != b'P5':
+        raise ValueError(f"{path} is not a binary (P5) PGM file")
+    width, height, maxval = (int(token) for token in tokens[1:])
+    return width, height, maxval, index + 1
+
+def image_occupancy(maxval, occupied_thresh=0.65):
+    # Dark pixels are occupied, as in ROS map_server images.
+    def to_occupancy(block):
+        occupied = (maxval - block.astype(np.float32)) / maxval > occupied_thresh
+        return np.where(occupied, -1, 0)
+    return to_occupancy
+
+def _load_png(path):
+    try:
+        from PIL import Image
+        return np.asarray(Image.open(path).convert('L'))
+    except ImportError:
+        import pygame
+        surface = pygame.image.load(path)
+        rgb = pygame.surfarray.array3d(surface).astype(np.float32)
+        return (rgb.mean(axis=2)).astype(np.uint8).T
+
+def load_map(path, tile_size=256, occupied_thresh=0.65):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.npy':
+        # Copy-on-write: cost changes stay in this process and never touch the file.
+        source = np.load(path, mmap_mode='c')
+        if source.dtype == np.bool_:
+            grid = TiledGrid(source, lambda block: np.where(block, -1, 0), tile_size)
+        elif np.issubdtype(source.dtype, np.unsignedinteger):
+            grid = TiledGrid(source, image_occupancy(np.iinfo(source.dtype).max, occupied_thresh), tile_size)
+        else:
+            grid = source
+    elif extension == '.pgm':
+        width, height, maxval, offset = _read_pgm_header(path)
+        dtype = np.uint8 if maxval < 256 else np.dtype('>u2')
+        image = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=(height, width))
+        grid = TiledGrid(image.T, image_occupancy(maxval, occupied_thresh), tile_size)
+    elif extension == '.png':
+        # PNG is compressed and can't be mapped, so it is decoded once and tiled from memory.
+        grid = TiledGrid(_load_png(path).T, image_occupancy(255, occupied_thresh), tile_size)
+    else:
+        raise ValueError(f"Unsupported map format: {extension}")
+    return OccupancyGridMap(grid.shape[0], grid.shape[1], grid=grid)
+
+def save_map(map, path):
+    np.save(path, np.asarray(map.grid))
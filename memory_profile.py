@@ -0,0 +1,181 @@
+import argparse
+import json
+import sys
+import tracemalloc
+from planner_state import PLANNER_CLASSES
+from occupancy_grid import make_world
+from simulation import RandomWalkers, Simulation
+
+STRUCTURES = ('g_rhs', 'open_list', 'visited_nodes', 'neighbor_table', 'path')
+
+def _queue_bytes(open_list, extra=()):
+    # Heap list and position dict, plus the entries they point to. Entries all have the same shape,
+    # ((k1, k2), id), so the first one is measured and scaled instead of walking the whole heap.
+    size = sys.getsizeof(open_list.elements) + sys.getsizeof(open_list.positions)
+    if open_list.elements:
+        key, item = open_list.elements[0]
+        entry = sys.getsizeof(open_list.elements[0]) + sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key)
+        size += len(open_list.elements) * (entry + sys.getsizeof(item))
+    for cells in extra:
+        size += sys.getsizeof(cells) + sum(sys.getsizeof(u) for u in cells)
+    return size
+
+def _list_bytes(values):
+    # A list of equally shaped values (cells, flat ids), measured through its first element.
+    if values is None:
+        return 0
+    if not values:
+        return sys.getsizeof(values)
+    first = values[0]
+    item = sys.getsizeof(first) + (sum(sys.getsizeof(v) for v in first) if isinstance(first, tuple) else 0)
+    return sys.getsizeof(values) + len(values) * item
+
+def structure_bytes(planner):
+    # Current size of each planner structure in bytes; 0 for structures the planner does not have.
+    sizes = dict.fromkeys(STRUCTURES, 0)
+    if hasattr(planner, 'g'):
+        sizes['g_rhs'] = planner.g.nbytes + planner.rhs.nbytes
+    if hasattr(planner, 'open_list'):
+        # The anytime planner's CLOSED and INCONS sets are counted with the open list they feed.
+        sizes['open_list'] = _queue_bytes(planner.open_list, [getattr(planner, name) for name in ('closed', 'incons')
+                                                              if hasattr(planner, name)])
+    visited = getattr(planner, 'visited_nodes', None)
+    if visited is not None:
+        sizes['visited_nodes'] = sys.getsizeof(visited.bits)
+    table = getattr(planner, 'table', None)
+    if table is not None:
+        sizes['neighbor_table'] = table.nbytes()
+    cache = getattr(planner, 'path_cache', None)
+    if cache is not None:
+        sizes['path'] = (_list_bytes(cache.path) + _list_bytes(cache.cells)
+                         + (cache.array.nbytes if cache.array is not None else 0))
+    else:
+        sizes['path'] = _list_bytes(getattr(planner, 'path', None))
+    return sizes
+
+class MemoryProfiler:
+    # One record per replan: the tracemalloc peak and growth since the previous replan ended (map changes
+    # included), and the peak size of each planner structure. Structures are sampled every sample_every
+    # expansions through on_expand while tracing, and once more at the end. Either call begin()/end() around
+    # each planning call, or attach() to a planner with an on_replan hook.
+    SAMPLE_EVERY = 256
+
+    def __init__(self, planner, sample_every=SAMPLE_EVERY):
+        self.planner = planner
+        self.sample_every = sample_every
+        self.records = []
+        self.owns_tracing = False
+        self.base = 0
+        self.sizes = dict.fromkeys(STRUCTURES, 0)
+        self.expansions = 0
+        self.previous_on_expand = None
+        self.watching = False
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.owns_tracing = True
+        self.watch()
+        self.begin()
+        return self
+
+    def stop(self):
+        if self.watching:
+            self.planner.on_expand = self.previous_on_expand
+            self.watching = False
+        if self.owns_tracing:
+            tracemalloc.stop()
+            self.owns_tracing = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def watch(self):
+        if self.watching or not hasattr(self.planner, 'on_expand'):
+            return
+        previous = self.previous_on_expand = self.planner.on_expand
+        def on_expand(cell):
+            self.expansions += 1
+            if self.expansions % self.sample_every == 0:
+                self.sample()
+            if previous is not None:
+                previous(cell)
+        self.planner.on_expand = on_expand
+        self.watching = True
+
+    def sample(self):
+        sizes = self.sizes
+        for name, size in structure_bytes(self.planner).items():
+            if size > sizes[name]:
+                sizes[name] = size
+
+    def begin(self):
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        self.sizes = dict.fromkeys(STRUCTURES, 0)
+
+    def end(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.sample()
+        record = {'replan': len(self.records), 'traced_peak': peak - self.base, 'traced_growth': current - self.base}
+        record.update((f'{name}_bytes', size) for name, size in self.sizes.items())
+        self.records.append(record)
+        self.begin()
+        return record
+
+    def attach(self):
+        previous = self.planner.on_replan
+        def on_replan(planner):
+            self.end()
+            if previous is not None:
+                previous(planner)
+        self.planner.on_replan = on_replan
+        return self
+
+    def peaks(self, records=None):
+        records = self.records if records is None else records
+        peaks = dict.fromkeys(['traced_peak'] + [f'{name}_bytes' for name in STRUCTURES], 0)
+        for record in records:
+            for name in peaks:
+                peaks[name] = max(peaks[name], record[name])
+        return peaks
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Per-replan memory of each planner structure in a closed-loop simulation.")
+    parser.add_argument('--planner', choices=list(PLANNER_CLASSES), default='DStarLite')
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--density', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--walkers', type=int, default=20, help="number of random-walk obstacles")
+    parser.add_argument('--connectivity', type=int, choices=[4, 8], default=4)
+    parser.add_argument('--output', default='-', help="file for per-replan JSON lines, '-' for stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    truth, start, goal, _ = make_world(args.size, args.density, args.seed)
+    sim = Simulation(truth, start, goal, PLANNER_CLASSES[args.planner], seed=args.seed, connectivity=args.connectivity)
+    if args.walkers:
+        sim.generators.append(RandomWalkers(args.walkers))
+    with MemoryProfiler(sim.planner) as profiler:
+        profiler.attach()
+        sim.run(args.ticks)
+    file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        for record in profiler.records:
+            file.write(json.dumps(record) + '\n')
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    peaks = profiler.peaks()
+    print(f"{args.planner} {args.size}x{args.size}: {len(profiler.records)} replans, traced peak "
+          f"{peaks['traced_peak'] / 1024:.1f}KiB; " + ', '.join(f"{name} {peaks[f'{name}_bytes'] / 1024:.1f}KiB"
+                                                             for name in STRUCTURES), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
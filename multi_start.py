@@ -0,0 +1,72 @@
+import numpy as np
+import batch_update
+from d_star_lite import DStarLite
+from grid_graph import neighbor_offsets
+
+class GoalTree(DStarLite):
+    # D* Lite rooted at one goal with a zero heuristic: keys no longer depend on s_start, so k_m stays 0
+    # and the same g/rhs field answers path queries from any number of starts. Each query only expands
+    # what the previous ones haven't settled yet.
+    def __init__(self, map, s_goal, headless=True, cost_dtype=np.float64, connectivity=4):
+        super().__init__(map, s_goal, s_goal, headless=headless, random_obstacles=False, cost_dtype=cost_dtype,
+                         connectivity=connectivity, heuristic='zero')
+
+    def query(self, start):
+        self.s_start = start
+        self.s_last = start
+        return self.compute_shortest_path()
+
+    def query_many(self, starts):
+        return {start: self.query(start) for start in starts}
+
+    def cost_to_goal(self, start):
+        self.query(start)
+        return float(self.g[start])
+
+class FleetPlanner:
+    # One GoalTree per goal, shared by every robot heading there. Map changes are written once and pushed
+    # into each tree once, no matter how many robots use it.
+    def __init__(self, map, connectivity=4, cost_dtype=np.float64, headless=True):
+        self.map = map
+        self.connectivity = connectivity
+        self.cost_dtype = cost_dtype
+        self.headless = headless
+        self.trees = {}
+        self.robots = {}
+
+    def tree(self, goal):
+        tree = self.trees.get(goal)
+        if tree is None:
+            tree = GoalTree(self.map, goal, headless=self.headless, cost_dtype=self.cost_dtype, connectivity=self.connectivity)
+            self.trees[goal] = tree
+        return tree
+
+    def set_robot(self, robot, position, goal=None):
+        if goal is None:
+            goal = self.robots[robot][1]
+        self.robots[robot] = (position, goal)
+
+    def remove_robot(self, robot):
+        _, goal = self.robots.pop(robot)
+        if all(other_goal != goal for _, other_goal in self.robots.values()):
+            self.trees.pop(goal, None)
+
+    def plan(self, robot):
+        position, goal = self.robots[robot]
+        return self.tree(goal).query(position)
+
+    def plan_all(self):
+        return {robot: self.plan(robot) for robot in self.robots}
+
+    def apply_changes(self, changes):
+        cells, costs = batch_update.split_changes(changes)
+        if len(cells) == 0:
+            return 0
+        self.map.set_costs(cells[:, 0], cells[:, 1], costs)
+        affected = batch_update.with_neighbors(cells, self.map.x_dim, self.map.y_dim, neighbor_offsets(self.connectivity))
+        for tree in self.trees.values():
+            tree.update_vertices(affected)
+        return len(affected)
+
+    def modify_cost(self, X, Y, new_cost):
+        self.apply_changes([((X, Y), new_cost)])
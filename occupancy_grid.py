@@ -0,0 +1,28 @@
+import numpy as np
+
+class OccupancyGridMap:
+    def __init__(self, x_dim, y_dim, dtype=np.int8, grid=None):
+        self.x_dim = x_dim
+        self.y_dim = y_dim
+        # -1 marks obstacles; start/goal are kept as markers, not in the occupancy layer
+        self.grid = grid if grid is not None else np.zeros((x_dim, y_dim), dtype=dtype)
+        self.start = None
+        self.goal = None
+        # Called with (xs, ys) after set_costs, e.g. by the GUI renderer to redraw just those cells.
+        self.listeners = []
+
+    def set_costs(self, xs, ys, costs):
+        # Map changes go through here rather than straight to the grid, so listeners see them.
+        self.grid[xs, ys] = costs
+        for listener in self.listeners:
+            listener(xs, ys)
+
+def make_world(grid_size, density, seed):
+    # The seeded random world shared by benchmarks, traces and simulations: obstacles at the given density,
+    # then distinct free start and goal cells. The generator is returned so callers can keep drawing from it.
+    rng = np.random.default_rng(seed)
+    map = OccupancyGridMap(grid_size, grid_size)
+    map.grid[rng.random((grid_size, grid_size)) < density] = -1
+    free = np.argwhere(map.grid != -1)
+    start, goal = (tuple(int(v) for v in free[i]) for i in rng.choice(len(free), size=2, replace=False))
+    return map, start, goal, rng
@@ -0,0 +1,31 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from occupancy_grid import OccupancyGridMap
+from d_star_lite import DStarLite
+
+_worker_grid = None
+
+def _init_worker(grid):
+    global _worker_grid
+    _worker_grid = grid
+
+def _plan_query(args):
+    planner_class, planner_kwargs, start, goal = args
+    x_dim, y_dim = _worker_grid.shape
+    map = OccupancyGridMap(x_dim, y_dim, grid=_worker_grid)
+    planner = planner_class(map=map, s_start=start, s_goal=goal, headless=True, random_obstacles=False, **planner_kwargs)
+    path = planner.compute_shortest_path()
+    return path, len(planner.visited_nodes)
+
+def plan_many(grid, queries, planner_class=DStarLite, planner_kwargs=None, max_workers=None, chunksize=1):
+    # Each (start, goal) query gets its own planner; the grid is shipped once per worker process.
+    grid = np.asarray(grid)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    tasks = [(planner_class, planner_kwargs or {}, tuple(start), tuple(goal)) for start, goal in queries]
+    if max_workers == 1:
+        _init_worker(grid)
+        return [_plan_query(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(grid,)) as executor:
+        return list(executor.map(_plan_query, tasks, chunksize=chunksize))
@@ -0,0 +1,103 @@
+import numpy as np
+
+class PathCache:
+    # The greedy path walk from s_start, kept between extractions. The step out of a cell only depends on its
+    # own edge row and the g values of its neighbors, so after a replan only the suffix starting at the first
+    # cell next to a changed cell (g set during the search, or edge row patched by a map change) is walked again.
+    # When the robot has moved along the cached path, the prefix behind it is dropped.
+    def __init__(self, planner):
+        self.planner = planner
+        self.cells = None
+        self.dirty = []
+        self.path = None
+        self.array = None
+
+    def clear(self):
+        self.cells = None
+        self.dirty = []
+        self.path = None
+        self.array = None
+
+    def touch(self, indices):
+        if self.cells is not None:
+            self.dirty.extend(indices)
+
+    def first_invalid(self, cells):
+        if not self.dirty:
+            return len(cells)
+        dirty = np.unique(np.array(self.dirty, dtype=np.intp))
+        deltas = np.array(self.planner.table.deltas, dtype=np.intp)
+        # Cells whose step may differ: the changed cells and everything that has one of them as a neighbor.
+        # Flat offsets can wrap at row ends, which only marks a few extra cells.
+        marked = np.concatenate([dirty, (dirty[:, None] - deltas[None, :]).ravel()])
+        hits = np.flatnonzero(np.isin(np.array(cells, dtype=np.intp), marked))
+        return int(hits[0]) if len(hits) else len(cells)
+
+    def walk(self, cells):
+        # Continues the walk from cells[-1]; cells never includes the goal.
+        planner = self.planner
+        table = planner.table
+        g = planner.g_flat
+        goal = planner.goal_index
+        max_length = table.x_dim * table.y_dim
+        current = cells[-1]
+        while current != goal:
+            if len(cells) > max_length:
+                if not planner.headless:
+                    print("Path extraction did not converge.")
+                break
+            successors = table.successors(current)
+            if not successors:
+                if not planner.headless:
+                    print("No available neighbors to move to.")
+                break
+            current = min(successors, key=lambda item: g[item[0]] + item[1])[0]
+            if g[current] == np.inf:
+                if not planner.headless:
+                    print("Path blocked or goal unreachable.")
+                break
+            if current != goal:
+                cells.append(current)
+        return cells
+
+    def extract(self):
+        planner = self.planner
+        table = planner.table
+        start = table.index(planner.s_start)
+        cells = self.cells
+        offset = 0
+        if cells is not None and start != cells[0]:
+            try:
+                offset = cells.index(start)
+            except ValueError:
+                cells = None
+        if start == planner.goal_index:
+            self.clear()
+            return [planner.s_goal]
+        if cells is None:
+            cells = self.walk([start])
+        else:
+            invalid = self.first_invalid(cells[offset:])
+            if invalid == len(cells) - offset:
+                self.dirty = []
+                if offset:
+                    self.cells = cells[offset:]
+                    self.path = self.path[offset:]
+                    self.array = None
+                return list(self.path)
+            cells = self.walk(cells[offset:offset + invalid + 1])
+        self.cells = cells
+        self.dirty = []
+        self.path = [table.cell(u) for u in cells] + [planner.s_goal]
+        self.array = None
+        return list(self.path)
+
+    def as_array(self):
+        # (n, 2) array of the current path, built once per extraction and read-only so it can be handed on
+        # without copying.
+        if self.path is None:
+            self.extract()
+        if self.array is None:
+            self.array = np.array(self.path, dtype=np.intp).reshape(-1, 2)
+            self.array.flags.writeable = False
+        return self.array
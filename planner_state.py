@@ -0,0 +1,93 @@
+import numpy as np
+from d_star import DStar
+from d_star_lite import DStarLite
+from occupancy_grid import OccupancyGridMap
+from heuristics import HEURISTICS, LandmarkHeuristic
+from priority_queue import PriorityQueue
+
+PLANNER_CLASSES = {
+    'DStar': DStar,
+    'DStarLite': DStarLite,
+}
+
+def heuristic_name(planner):
+    if isinstance(planner.heuristic, LandmarkHeuristic):
+        return 'alt'
+    for name, (function, _) in HEURISTICS.items():
+        if planner.heuristic is function:
+            return name
+    return ''
+
+def save_state(planner, path, compress=True):
+    # Everything needed to resume incremental planning: the cost field, the open list in heap order
+    # (so it can be loaded without re-heapifying), k_m, the start/goal bookkeeping and the grid it belongs to.
+    open_list = planner.open_list.elements
+    arrays = {
+        'planner': np.array(type(planner).__name__),
+        'heuristic': np.array(heuristic_name(planner)),
+        'connectivity': np.array(planner.connectivity),
+        'g': planner.g,
+        'rhs': planner.rhs,
+        'heap_keys': np.array([key for key, _ in open_list], dtype=np.float64).reshape(-1, 2),
+        'heap_cells': np.array([cell for _, cell in open_list], dtype=np.intp),
+        'k_m': np.array(planner.k_m, dtype=np.float64),
+        's_start': np.array(planner.s_start),
+        's_last': np.array(planner.s_last),
+        's_goal': np.array(planner.s_goal),
+        'grid': np.asarray(planner.map.grid),
+        'visited': np.frombuffer(bytes(planner.visited_nodes.bits), dtype=np.uint8),
+        'visited_count': np.array(planner.visited_nodes.count),
+    }
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+
+def restore_state(path, map=None, planner_class=None, heuristic=None, headless=True):
+    # Without a map, a new OccupancyGridMap is built from the saved grid. With one, cells that differ
+    # from the snapshot are fed to the planner as ordinary cost changes, so it resumes incrementally.
+    with np.load(path) as data:
+        state = {name: data[name] for name in data.files}
+    name = str(state['planner'])
+    planner_class = planner_class or PLANNER_CLASSES.get(name)
+    if planner_class is None:
+        raise ValueError(f"Unknown planner class {name!r}; pass planner_class")
+    heuristic = heuristic or str(state['heuristic'])
+    if not heuristic:
+        raise ValueError("The saved planner used a custom heuristic; pass heuristic")
+
+    saved_grid = state['grid']
+    changes = []
+    if map is None:
+        map = OccupancyGridMap(saved_grid.shape[0], saved_grid.shape[1], dtype=saved_grid.dtype, grid=saved_grid.copy())
+    else:
+        if (map.x_dim, map.y_dim) != saved_grid.shape:
+            raise ValueError(f"map is {map.x_dim}x{map.y_dim}, saved state is {saved_grid.shape[0]}x{saved_grid.shape[1]}")
+        cells = np.argwhere(np.asarray(map.grid != saved_grid))
+        if len(cells):
+            new_costs = np.asarray(map.grid[cells[:, 0], cells[:, 1]])
+            map.grid[cells[:, 0], cells[:, 1]] = saved_grid[cells[:, 0], cells[:, 1]]
+            changes = np.column_stack([cells, new_costs])
+
+    s_start = tuple(int(v) for v in state['s_start'])
+    s_goal = tuple(int(v) for v in state['s_goal'])
+    planner = planner_class(map=map, s_start=s_start, s_goal=s_goal, headless=headless, random_obstacles=False,
+                            cost_dtype=state['g'].dtype, connectivity=int(state['connectivity']), heuristic=heuristic)
+    # Copied into the planner's own arrays, which its flat views share.
+    planner.g[...] = state['g']
+    planner.rhs[...] = state['rhs']
+    planner.k_m = float(state['k_m'])
+    planner.s_last = tuple(int(v) for v in state['s_last'])
+
+    open_list = PriorityQueue()
+    cells = state['heap_cells'].tolist()
+    open_list.elements = [(tuple(key), cell) for key, cell in zip(state['heap_keys'].tolist(), cells)]
+    open_list.positions = {cell: index for index, cell in enumerate(cells)}
+    planner.open_list = open_list
+    if heuristic == 'alt':
+        # Landmark tables are rebuilt on load and need not match the saved keys exactly.
+        open_list.rekey(planner.key)
+
+    planner.visited_nodes.bits = bytearray(state['visited'].tobytes())
+    planner.visited_nodes.count = int(state['visited_count'])
+
+    if len(changes):
+        planner.apply_changes(changes, replan=False)
+    return planner
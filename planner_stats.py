@@ -0,0 +1,39 @@
+import time
+
+class PlannerStats:
+    COUNTERS = ('expansions', 'heap_pushes', 'stale_pops', 'vertex_updates', 'rhs_recomputations', 'replans')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.timings = {}
+        self.calls = {}
+
+    def record_time(self, phase, seconds):
+        self.timings[phase] = self.timings.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def timer(self, phase):
+        return _PhaseTimer(self, phase)
+
+    def as_dict(self):
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats['timings'] = dict(self.timings)
+        stats['calls'] = dict(self.calls)
+        return stats
+
+class _PhaseTimer:
+    def __init__(self, stats, phase):
+        self.stats = stats
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stats.record_time(self.phase, time.perf_counter() - self.start)
+        return False
@@ -0,0 +1,301 @@
+import argparse
+import gzip
+import json
+import math
+import struct
+import sys
+import time
+import numpy as np
+import batch_update
+import planner_state
+from anytime import AnytimeDStarLite
+from occupancy_grid import OccupancyGridMap, make_world
+from planner_state import heuristic_name
+
+MAGIC = b'DSTRACE1'
+EVENT = struct.Struct('<Biid')
+
+MOVE = 1             # s_start = (x, y), nothing else
+CHANGE = 2           # one cell of an apply_changes batch
+COMMIT = 3           # end of the batch; value is 1.0 if apply_changes replanned
+MODIFY_COST = 4      # modify_cost(x, y, value)
+PLAN = 5             # compute_shortest_path(); value is the expansion budget, NaN for none
+MOVE_AND_REPLAN = 6  # move_and_replan((x, y)); value as for PLAN
+
+# Snapshots cannot hold the anytime planner's CLOSED/INCONS sets, but a trace only needs its constructor options.
+PLANNER_CLASSES = dict(planner_state.PLANNER_CLASSES, AnytimeDStarLite=AnytimeDStarLite)
+PLANNER_OPTIONS = ('epsilon', 'epsilon_step', 'epsilon_min', 'max_expansions', 'budget_ms')
+
+EVENT_NAMES = {MOVE: 'move', CHANGE: 'change', COMMIT: 'apply_changes', MODIFY_COST: 'modify_cost',
+               PLAN: 'plan', MOVE_AND_REPLAN: 'move_and_replan'}
+
+def _open(path, mode):
+    return gzip.open(path, mode) if str(path).endswith('.gz') else open(path, mode)
+
+class TraceWriter:
+    # Header (JSON settings), the initial grid as raw bytes, then one fixed-size record per event.
+    # Records are written as they happen, so a trace of a crashed run is still readable up to the crash.
+    def __init__(self, path, planner):
+        if type(planner).__name__ not in PLANNER_CLASSES:
+            raise ValueError(f"Cannot trace {type(planner).__name__}; replay knows {', '.join(PLANNER_CLASSES)}")
+        grid = np.ascontiguousarray(np.asarray(planner.map.grid))
+        header = {
+            'planner': type(planner).__name__,
+            'heuristic': heuristic_name(planner),
+            'connectivity': planner.connectivity,
+            'cost_dtype': np.dtype(planner.g.dtype).name,
+            'grid_dtype': grid.dtype.str,
+            'shape': list(grid.shape),
+            's_start': list(planner.s_start),
+            's_goal': list(planner.s_goal),
+            'options': {name: getattr(planner, name) for name in PLANNER_OPTIONS if hasattr(planner, name)},
+        }
+        encoded = json.dumps(header).encode()
+        self.file = _open(path, 'wb')
+        self.file.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+        self.file.write(grid.tobytes())
+        self.events = 0
+
+    def write(self, op, cell=(0, 0), value=0.0):
+        self.file.write(EVENT.pack(op, int(cell[0]), int(cell[1]), float(value)))
+        self.events += 1
+
+    def close(self):
+        self.file.close()
+
+class TraceRecorder:
+    # Stands in for the planner: every call that changes planner state is written to the trace and then
+    # forwarded, everything else goes straight to the planner. Wrap the planner before its first plan.
+    def __init__(self, planner, path):
+        self.planner = planner
+        self.writer = TraceWriter(path, planner)
+
+    def __getattr__(self, name):
+        return getattr(self.planner, name)
+
+    def __setattr__(self, name, value):
+        # Assignments go to the planner; a new s_start is recorded as a move.
+        if name in ('planner', 'writer'):
+            object.__setattr__(self, name, value)
+        elif name == 's_start':
+            self.move(value)
+        else:
+            setattr(self.planner, name, value)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.writer.close()
+
+    def move(self, position):
+        self.writer.write(MOVE, position)
+        self.planner.s_start = tuple(position)
+
+    def _record_search(self, op, cell, search, budget):
+        # The expansion budget that repeats the search: max_expansions, or under a time budget, which cannot be
+        # repeated, the expansions the search made. Those are only known once it returns, so that record follows it.
+        planner = self.planner
+        def setting(name):
+            value = budget.get(name)
+            return getattr(planner, name, None) if value is None else value
+        if setting('budget_ms') is None:
+            max_expansions = setting('max_expansions')
+            self.writer.write(op, cell, math.nan if max_expansions is None else max_expansions)
+            return search()
+        expansions = planner.stats.expansions
+        result = search()
+        self.writer.write(op, cell, planner.stats.expansions - expansions)
+        return result
+
+    def compute_shortest_path(self, return_path=True, **budget):
+        # budget: the anytime planner's max_expansions and budget_ms.
+        return self._record_search(PLAN, (0, 0), lambda: self.planner.compute_shortest_path(return_path=return_path,
+                                                                                            **budget), budget)
+
+    def move_and_replan(self, robot_position):
+        return self._record_search(MOVE_AND_REPLAN, robot_position, lambda: self.planner.move_and_replan(robot_position), {})
+
+    def modify_cost(self, X, Y, new_cost):
+        self.writer.write(MODIFY_COST, (X, Y), new_cost)
+        return self.planner.modify_cost(X, Y, new_cost)
+
+    def apply_changes(self, changes, replan=True):
+        cells, costs = batch_update.split_changes(changes)
+        for cell, cost in zip(cells.tolist(), costs.tolist()):
+            self.writer.write(CHANGE, cell, cost)
+        self.writer.write(COMMIT, value=1.0 if replan else 0.0)
+        return self.planner.apply_changes(np.column_stack([cells, costs]), replan=replan)
+
+def read_trace(path):
+    # Returns (header, grid, events); events is a structured array with op, x, y and value fields.
+    with _open(path, 'rb') as file:
+        data = file.read()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"{path} is not a planner trace")
+    offset = len(MAGIC)
+    (length,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    header = json.loads(data[offset:offset + length])
+    offset += length
+    shape = tuple(header['shape'])
+    grid_dtype = np.dtype(header['grid_dtype'])
+    grid_bytes = int(np.prod(shape)) * grid_dtype.itemsize
+    grid = np.frombuffer(data, dtype=grid_dtype, count=int(np.prod(shape)), offset=offset).reshape(shape).copy()
+    offset += grid_bytes
+    event_dtype = np.dtype([('op', 'u1'), ('x', '<i4'), ('y', '<i4'), ('value', '<f8')])
+    count = (len(data) - offset) // EVENT.size
+    events = np.frombuffer(data, dtype=event_dtype, count=count, offset=offset)
+    return header, grid, events
+
+def make_planner(header, grid, planner_class=None, heuristic=None):
+    planner_class = planner_class or PLANNER_CLASSES[header['planner']]
+    # Options only apply to the recorded class, not to one that overrides it.
+    options = header.get('options', {}) if planner_class.__name__ == header['planner'] else {}
+    heuristic = heuristic or header['heuristic']
+    if not heuristic:
+        raise ValueError("The trace was recorded with a custom heuristic; pass heuristic")
+    map = OccupancyGridMap(grid.shape[0], grid.shape[1], dtype=grid.dtype, grid=grid)
+    return planner_class(map=map, s_start=tuple(header['s_start']), s_goal=tuple(header['s_goal']), headless=True,
+                         random_obstacles=False, cost_dtype=np.dtype(header['cost_dtype']),
+                         connectivity=header['connectivity'], heuristic=heuristic, **options)
+
+def replay_budget(planner, value):
+    # A recorded expansion budget replaces the planner's own budgets; NaN, or a planner without budgets, keeps them.
+    if math.isnan(value) or not hasattr(planner, 'max_expansions'):
+        return {}
+    return {'max_expansions': int(value), 'budget_ms': math.inf}
+
+def replay(path, planner_class=None, heuristic=None, emit=None):
+    # Drives a fresh planner through the recorded calls and times each one. CHANGE records are collected
+    # and applied as one batch at their COMMIT, like the original apply_changes call.
+    header, grid, events = read_trace(path)
+    planner = make_planner(header, grid, planner_class, heuristic)
+    stats = planner.stats
+    rows = []
+    batch = []
+    for index, (op, x, y, value) in enumerate(events.tolist()):
+        if op == CHANGE:
+            batch.append((x, y, value))
+            continue
+        expansions = stats.expansions
+        t0 = time.perf_counter()
+        if op == MOVE:
+            planner.s_start = (x, y)
+        elif op == COMMIT:
+            planner.apply_changes(np.array(batch, dtype=float).reshape(-1, 3), replan=bool(value))
+        elif op == MODIFY_COST:
+            planner.modify_cost(x, y, value)
+        elif op == PLAN:
+            planner.compute_shortest_path(return_path=False, **replay_budget(planner, value))
+        elif op == MOVE_AND_REPLAN:
+            # move_and_replan takes no budget, so the planner's own settings are swapped for the call.
+            budget = replay_budget(planner, value)
+            saved = {name: getattr(planner, name) for name in budget}
+            for name, setting in budget.items():
+                setattr(planner, name, setting)
+            try:
+                planner.move_and_replan((x, y))
+            finally:
+                for name, setting in saved.items():
+                    setattr(planner, name, setting)
+        else:
+            raise ValueError(f"Unknown trace event {op} at record {index}")
+        row = {
+            'event': index,
+            'op': EVENT_NAMES[op],
+            'cell': [x, y] if op in (MOVE, MODIFY_COST, MOVE_AND_REPLAN) else None,
+            'changes': len(batch) if op == COMMIT else 0,
+            'latency': time.perf_counter() - t0,
+            'expansions': stats.expansions - expansions,
+        }
+        batch = []
+        rows.append(row)
+        if emit is not None:
+            emit(row)
+    return rows
+
+def record_scenario(trace_path, planner_class, grid_size, density, seed, steps, block_probability=0.3,
+                    connectivity=4, heuristic='auto'):
+    # A reproducible run to record: the robot follows its path one cell per step, and with the given
+    # probability the cell a few steps ahead gets blocked first.
+    map, start, goal, rng = make_world(grid_size, density, seed)
+    planner = planner_class(map=map, s_start=start, s_goal=goal, headless=True, random_obstacles=False,
+                            connectivity=connectivity, heuristic=heuristic)
+    with TraceRecorder(planner, trace_path) as recorder:
+        path = recorder.compute_shortest_path()
+        for _ in range(steps):
+            if len(path) < 2 or path[-1] != goal or planner.g[path[0]] == np.inf:
+                break
+            ahead = path[min(3, len(path) - 2)]
+            if ahead != goal and ahead != path[0] and rng.random() < block_probability:
+                recorder.apply_changes([(ahead, -1)], replan=False)
+            path, _ = recorder.move_and_replan(path[1])
+        return recorder.writer.events
+
+def latency_summary(rows):
+    latencies = np.array([row['latency'] for row in rows], dtype=float)
+    if len(latencies) == 0:
+        return {'events': 0}
+    slowest = int(np.argmax(latencies))
+    return {
+        'events': len(rows),
+        'total': float(latencies.sum()),
+        'median': float(np.median(latencies)),
+        'p95': float(np.percentile(latencies, 95)),
+        'max': float(latencies[slowest]),
+        'slowest_event': rows[slowest]['event'],
+        'slowest_op': rows[slowest]['op'],
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Record planner traces and replay them with per-event latency.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="record a seeded move-and-block scenario")
+    record.add_argument('trace', help="output file; a .gz suffix compresses it")
+    record.add_argument('--planner', choices=list(PLANNER_CLASSES), default='DStarLite')
+    record.add_argument('--size', type=int, default=100)
+    record.add_argument('--density', type=float, default=0.2)
+    record.add_argument('--seed', type=int, default=0)
+    record.add_argument('--steps', type=int, default=50)
+    record.add_argument('--block-probability', type=float, default=0.3)
+    record.add_argument('--connectivity', type=int, choices=[4, 8], default=4)
+    record.add_argument('--heuristic', choices=['auto', 'manhattan', 'octile', 'euclidean', 'zero', 'alt'], default='auto')
+    play = commands.add_parser('replay', help="replay a trace headlessly")
+    play.add_argument('trace')
+    play.add_argument('--planner', choices=list(PLANNER_CLASSES), default=None, help="override the recorded planner class")
+    play.add_argument('--output', default='-', help="file for per-event JSON lines, '-' for stdout")
+    play.add_argument('--summary', default=None, help="optional JSON file for the latency summary")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'record':
+        events = record_scenario(args.trace, PLANNER_CLASSES[args.planner], args.size, args.density, args.seed, args.steps,
+                                 args.block_probability, args.connectivity, args.heuristic)
+        print(f"Recorded {events} events to {args.trace}", file=sys.stderr)
+        return
+
+    file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        def emit(row):
+            file.write(json.dumps(row) + '\n')
+        rows = replay(args.trace, PLANNER_CLASSES[args.planner] if args.planner else None, emit=emit)
+    finally:
+        if file is not sys.stdout:
+            file.close()
+    summary = latency_summary(rows)
+    if rows:
+        print(f"{summary['events']} events in {summary['total']:.4f}s: median {summary['median'] * 1000:.3f}ms "
+              f"p95 {summary['p95'] * 1000:.3f}ms, slowest {summary['max'] * 1000:.3f}ms at event {summary['slowest_event']} "
+              f"({summary['slowest_op']})", file=sys.stderr)
+    if args.summary:
+        with open(args.summary, 'w') as file:
+            json.dump(summary, file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import batch_update
+from d_star_lite import DStarLite
+from grid_graph import neighbor_offsets
+from occupancy_grid import OccupancyGridMap
+
+class Shard:
+    # The planners of the robots placed on one worker process, with that process's own copy of each map they
+    # use. The service sends it map deltas, and the shard writes them into its copy and queues the affected
+    # cells on every session of that map before the next replan.
+    def __init__(self):
+        self.maps = {}
+        self.sessions = {}
+
+    def add_map(self, name, grid):
+        x_dim, y_dim = grid.shape
+        self.maps[name] = OccupancyGridMap(x_dim, y_dim, dtype=grid.dtype, grid=np.array(grid))
+
+    def open_session(self, robot, map_name, start, goal, planner_kwargs):
+        planner = DStarLite(map=self.maps[map_name], s_start=tuple(start), s_goal=tuple(goal), headless=True,
+                            random_obstacles=False, **planner_kwargs)
+        self.sessions[robot] = (map_name, planner, [])
+
+    def close_session(self, robot):
+        self.sessions.pop(robot, None)
+
+    def apply(self, map_name, cells, costs):
+        map = self.maps[map_name]
+        old_costs = np.asarray(map.grid[cells[:, 0], cells[:, 1]])
+        map.set_costs(cells[:, 0], cells[:, 1], costs)
+        sessions = [(planner, affected) for name, planner, affected in self.sessions.values() if name == map_name]
+        heuristics = {id(planner.heuristic): planner.heuristic for planner, _ in sessions}
+        for heuristic in heuristics.values():
+            notify_changes = getattr(heuristic, 'notify_changes', None)
+            if notify_changes is not None:
+                notify_changes(cells, old_costs, costs)
+        for planner, affected in sessions:
+            offsets = neighbor_offsets(planner.connectivity)
+            affected.append(batch_update.with_neighbors(cells, map.x_dim, map.y_dim, offsets))
+
+    def replan(self, robot, deltas, position):
+        map_name, planner, affected = self.sessions[robot]
+        for name, cells, costs in deltas:
+            self.apply(name, cells, costs)
+        planner.s_start = position
+        planner.k_m += planner.heuristic(planner.s_last, planner.s_start)
+        planner.s_last = planner.s_start
+        if affected:
+            planner.update_vertices(np.concatenate(affected))
+            affected.clear()
+        return planner.compute_shortest_path()
+
+    def stats(self, robot):
+        return self.sessions[robot][1].stats.as_dict()
+
+_shard = None
+
+def _init_shard():
+    global _shard
+    _shard = Shard()
+
+def _shard_call(method, *args):
+    return getattr(_shard, method)(*args)
+
+class ShardHandle:
+    # One worker process taking one call at a time, so calls run in the order they were submitted. With
+    # in_process=True the shard lives in this process and calls run inline, e.g. for debugging.
+    def __init__(self, in_process=False):
+        self.shard = Shard() if in_process else None
+        self.executor = None if in_process else ProcessPoolExecutor(max_workers=1, initializer=_init_shard)
+        self.robots = set()
+        self.maps = {}  # map name -> {cell: cost} written on the service's map but not yet sent here
+
+    def submit(self, method, *args):
+        if self.shard is not None:
+            future = asyncio.get_running_loop().create_future()
+            try:
+                future.set_result(getattr(self.shard, method)(*args))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        return asyncio.wrap_future(self.executor.submit(_shard_call, method, *args))
+
+    def take_deltas(self):
+        deltas = []
+        for name, unsent in self.maps.items():
+            if unsent:
+                cells = np.array(list(unsent), dtype=np.intp).reshape(-1, 2)
+                deltas.append((name, cells, np.array(list(unsent.values()))))
+                unsent.clear()
+        return deltas
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+class MapState:
+    def __init__(self, name, map):
+        self.name = name
+        self.map = map
+        self.pending = {}
+        self.version = 0
+        self.shards = set()
+
+class Session:
+    def __init__(self, robot, state, shard, position):
+        self.robot = robot
+        self.state = state
+        self.shard = shard
+        self.position = position
+        self.path = None
+        self.planned_for = None
+
+class PlanningService:
+    # Maps are shared by all robots on them. Each robot's DStarLite session lives on one of the worker
+    # processes (shards), which replan in parallel; robots are placed on the shard with the fewest sessions.
+    # Map updates are only queued when they arrive. Right before the next replan on that map they are written
+    # to the service's map in one batch and queued as a delta for every shard holding the map, so updates that
+    # arrive while replans are running are coalesced. A shard receives its deltas with its next replan request.
+    # workers=0 keeps a single shard in this process.
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.shards = [ShardHandle(in_process=True)] if workers == 0 else [ShardHandle() for _ in range(workers)]
+        self.maps = {}
+        self.sessions = {}
+
+    def add_map(self, name, map):
+        self.maps[name] = MapState(name, map)
+        return map
+
+    def create_map(self, name, x_dim, y_dim, grid=None):
+        grid = np.array(grid, dtype=np.int8) if grid is not None else None
+        return self.add_map(name, OccupancyGridMap(x_dim, y_dim, grid=grid))
+
+    async def open_session(self, robot, map_name, start, goal, **planner_kwargs):
+        if robot in self.sessions:
+            await self.close_session(robot)
+        state = self.maps[map_name]
+        shard = min(self.shards, key=lambda shard: len(shard.robots))
+        if shard not in state.shards:
+            # The shard gets the map as it is now; only later flushes are sent to it as deltas.
+            state.shards.add(shard)
+            shard.maps[map_name] = {}
+            await shard.submit('add_map', map_name, np.array(state.map.grid))
+        shard.robots.add(robot)
+        session = Session(robot, state, shard, tuple(start))
+        self.sessions[robot] = session
+        await shard.submit('open_session', robot, map_name, tuple(start), tuple(goal), planner_kwargs)
+        return session
+
+    async def close_session(self, robot):
+        session = self.sessions.pop(robot)
+        session.shard.robots.discard(robot)
+        await session.shard.submit('close_session', robot)
+
+    def report_position(self, robot, position):
+        self.sessions[robot].position = tuple(position)
+
+    def update_map(self, map_name, changes):
+        # Later updates of the same cell overwrite earlier ones that haven't been applied yet.
+        state = self.maps[map_name]
+        cells, costs = batch_update.split_changes(changes)
+        for cell, cost in zip(cells.tolist(), costs.tolist()):
+            state.pending[tuple(cell)] = cost
+        return len(state.pending)
+
+    def _flush(self, state):
+        pending, state.pending = state.pending, {}
+        cells = np.array(list(pending), dtype=np.intp).reshape(-1, 2)
+        state.map.set_costs(cells[:, 0], cells[:, 1], np.array(list(pending.values())))
+        for shard in state.shards:
+            shard.maps[state.name].update(pending)
+        state.version += 1
+
+    async def get_path(self, robot):
+        # Nothing here awaits between flushing and submitting, so every shard gets deltas in map order.
+        session = self.sessions[robot]
+        state = session.state
+        if state.pending:
+            self._flush(state)
+        planned_for = (state.version, session.position)
+        if session.planned_for != planned_for:
+            path = await session.shard.submit('replan', robot, session.shard.take_deltas(), session.position)
+            session.path, session.planned_for = path, planned_for
+        return session.path
+
+    async def stats(self, robot):
+        session = self.sessions[robot]
+        return await session.shard.submit('stats', robot)
+
+    def shutdown(self):
+        for shard in self.shards:
+            shard.shutdown()
+
+    async def handle(self, request):
+        op = request.get('op')
+        if op == 'create_map':
+            map = self.create_map(request['map'], request['x_dim'], request['y_dim'], request.get('grid'))
+            return {'x_dim': map.x_dim, 'y_dim': map.y_dim}
+        if op == 'open_session':
+            options = {key: request[key] for key in ('connectivity', 'heuristic') if key in request}
+            await self.open_session(request['robot'], request['map'], request['start'], request['goal'], **options)
+            return None
+        if op == 'close_session':
+            await self.close_session(request['robot'])
+            return None
+        if op == 'update_map':
+            changes = np.array(request['changes'], dtype=float).reshape(-1, 3)
+            return {'pending': self.update_map(request['map'], changes)}
+        if op == 'report_position':
+            self.report_position(request['robot'], request['position'])
+            return None
+        if op == 'get_path':
+            return {'path': [list(cell) for cell in await self.get_path(request['robot'])]}
+        if op == 'stats':
+            return await self.stats(request['robot'])
+        raise ValueError(f"Unknown op: {op}")
+
+    async def _answer(self, request, writer, write_lock):
+        try:
+            response = {'ok': True, 'result': await self.handle(request)}
+        except Exception as error:
+            response = {'ok': False, 'error': f"{type(error).__name__}: {error}"}
+        if 'id' in request:
+            response['id'] = request['id']
+        async with write_lock:
+            writer.write((json.dumps(response) + '\n').encode())
+            await writer.drain()
+
+    async def serve_connection(self, reader, writer):
+        # One JSON object per line; requests run concurrently and responses carry the request's id.
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as error:
+                    async with write_lock:
+                        writer.write((json.dumps({'ok': False, 'error': f"invalid JSON: {error}"}) + '\n').encode())
+                        await writer.drain()
+                    continue
+                task = asyncio.create_task(self._answer(request, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        return await asyncio.start_server(self.serve_connection, host, port)
+
+class PlanningClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.waiting = {}
+        self.receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _receive(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self.waiting.pop(response.get('id'), None)
+            if future is not None:
+                future.set_result(response)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("planning service closed the connection"))
+
+    async def request(self, op, **fields):
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[self.next_id] = future
+        self.writer.write((json.dumps(dict(fields, op=op, id=self.next_id)) + '\n').encode())
+        await self.writer.drain()
+        response = await future
+        if not response['ok']:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    async def close(self):
+        self.writer.close()
+        await self.receiver
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve D* Lite path planning over JSON lines on a local socket.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=None, help="worker processes the robots' planners are spread over; 0 plans in this process")
+    return parser.parse_args(argv)
+
+async def run_server(host, port, workers):
+    service = PlanningService(workers=workers)
+    server = await service.serve(host, port)
+    print(f"Planning service listening on {host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.shutdown()
+
+def main(argv=None):
+    args = parse_args(argv)
+    asyncio.run(run_server(args.host, args.port, args.workers))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import heapq
+
+def key_less(a, b, tolerance=1e-9):
+    # Keys built from irrational step costs (sqrt 2) can differ by an ulp for equal values;
+    # treat those as ties so the tie-breaker decides.
+    if a[0] < b[0] - tolerance:
+        return True
+    if a[0] > b[0] + tolerance:
+        return False
+    return a[1] < b[1] - tolerance
+
+class PriorityQueue:
+    def __init__(self):
+        self.elements = []
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def empty(self):
+        return len(self.elements) == 0
+
+    def top_key(self):
+        if not self.elements:
+            return (float('inf'), float('inf'))
+        return self.elements[0][0]
+
+    def put(self, item, priority):
+        index = self.positions.get(item)
+        if index is None:
+            self.elements.append((priority, item))
+            index = len(self.elements) - 1
+            self.positions[item] = index
+            self._sift_up(index)
+            return
+        old_priority = self.elements[index][0]
+        self.elements[index] = (priority, item)
+        if priority < old_priority:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def get(self):
+        return self.pop()[1]
+
+    def pop(self):
+        entry = self.elements[0]
+        last = self.elements.pop()
+        del self.positions[entry[1]]
+        if self.elements:
+            self.elements[0] = last
+            self.positions[last[1]] = 0
+            self._sift_down(0)
+        return entry
+
+    def remove(self, item):
+        index = self.positions.pop(item, None)
+        if index is None:
+            return False
+        last = self.elements.pop()
+        if index < len(self.elements):
+            self.elements[index] = last
+            self.positions[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self.positions[last[1]])
+        return True
+
+    def rekey(self, key_function):
+        self.elements = [(key_function(item), item) for _, item in self.elements]
+        heapq.heapify(self.elements)
+        self.positions = {item: index for index, (_, item) in enumerate(self.elements)}
+
+    def _sift_up(self, index):
+        elements = self.elements
+        positions = self.positions
+        entry = elements[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if entry < elements[parent]:
+                elements[index] = elements[parent]
+                positions[elements[index][1]] = index
+                index = parent
+            else:
+                break
+        elements[index] = entry
+        positions[entry[1]] = index
+
+    def _sift_down(self, index):
+        elements = self.elements
+        positions = self.positions
+        size = len(elements)
+        entry = elements[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and elements[child + 1] < elements[child]:
+                child += 1
+            if elements[child] < entry:
+                elements[index] = elements[child]
+                positions[elements[index][1]] = index
+                index = child
+            else:
+                break
+        elements[index] = entry
+        positions[entry[1]] = index
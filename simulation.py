@@ -0,0 +1,244 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from anytime import AnytimeDStarLite
+from occupancy_grid import OccupancyGridMap, make_world
+from planner_state import PLANNER_CLASSES
+from slam import SLAM
+
+class RandomWalkers:
+    # Obstacles that take one random 4-connected step per tick onto free cells.
+    def __init__(self, count):
+        self.count = count
+        self.positions = None
+
+    def step(self, sim):
+        grid = sim.truth.grid
+        rng = sim.rng
+        changes = []
+        if self.positions is None:
+            free = np.argwhere(sim.base_grid != -1)
+            picks = rng.choice(len(free), size=min(self.count, len(free)), replace=False)
+            self.positions = [tuple(int(v) for v in free[i]) for i in picks]
+            self.positions = [cell for cell in self.positions if not sim.reserved(cell)]
+            return [(cell, -1) for cell in self.positions]
+        offsets = ((-1, 0), (1, 0), (0, -1), (0, 1))
+        for index, (x, y) in enumerate(self.positions):
+            dx, dy = offsets[rng.integers(4)]
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < sim.x_dim and 0 <= ny < sim.y_dim) or grid[nx, ny] == -1 or sim.reserved((nx, ny)):
+                continue
+            changes.append(((x, y), sim.base_grid[x, y]))
+            changes.append(((nx, ny), -1))
+            grid[x, y] = sim.base_grid[x, y]
+            grid[nx, ny] = -1
+            self.positions[index] = (nx, ny)
+        return changes
+
+class Doors:
+    # Fixed groups of cells that close and open together every `period` ticks, each door with its own phase.
+    def __init__(self, doors, period=20):
+        self.doors = [[tuple(cell) for cell in door] for door in doors]
+        self.period = period
+
+    @classmethod
+    def random(cls, sim, count, width=3, period=20):
+        doors = []
+        for _ in range(count):
+            x = int(sim.rng.integers(sim.x_dim))
+            y = int(sim.rng.integers(max(1, sim.y_dim - width)))
+            doors.append([(x, y + i) for i in range(width) if y + i < sim.y_dim])
+        return cls(doors, period)
+
+    def step(self, sim):
+        changes = []
+        for index, door in enumerate(self.doors):
+            phase = (sim.tick + index * self.period // max(1, len(self.doors))) % (2 * self.period)
+            if phase not in (0, self.period):
+                continue
+            closed = phase == 0
+            for cell in door:
+                if sim.reserved(cell) or sim.base_grid[cell] == -1:
+                    continue
+                changes.append((cell, -1 if closed else sim.base_grid[cell]))
+        return changes
+
+class CorridorBlockages:
+    # Every `interval` ticks, blocks `length` cells across the robot's path `distance` cells ahead,
+    # and clears them again after `duration` ticks.
+    def __init__(self, interval=10, distance=5, length=3, duration=15):
+        self.interval = interval
+        self.distance = distance
+        self.length = length
+        self.duration = duration
+        self.active = []
+
+    def step(self, sim):
+        changes = []
+        while self.active and self.active[0][0] <= sim.tick:
+            _, cells = self.active.pop(0)
+            changes.extend((cell, sim.base_grid[cell]) for cell in cells)
+        path = sim.path
+        if sim.tick % self.interval == 0 and path and len(path) > self.distance + 1:
+            x, y = path[self.distance]
+            px, py = path[self.distance - 1]
+            # Lay the blockage across the direction of travel.
+            dx, dy = (0, 1) if px != x else (1, 0)
+            half = self.length // 2
+            cells = [(x + dx * i, y + dy * i) for i in range(-half, self.length - half)]
+            cells = [cell for cell in cells if 0 <= cell[0] < sim.x_dim and 0 <= cell[1] < sim.y_dim
+                     and not sim.reserved(cell) and sim.base_grid[cell] != -1]
+            if cells:
+                self.active.append((sim.tick + self.duration, cells))
+                changes.extend((cell, -1) for cell in cells)
+        return changes
+
+class Simulation:
+    # Closed loop: obstacles move in the ground truth, the robot senses what changed (everything, or only
+    # within view_range through SLAM), replans from its current cell and takes one step along the path.
+    def __init__(self, truth, start, goal, planner_class, generators=(), view_range=None, seed=0, **planner_kwargs):
+        self.truth = truth
+        self.base_grid = np.array(truth.grid, copy=True)
+        self.x_dim, self.y_dim = truth.x_dim, truth.y_dim
+        self.start = start
+        self.goal = goal
+        self.position = start
+        self.generators = list(generators)
+        self.rng = np.random.default_rng(seed)
+        self.tick = 0
+        known = OccupancyGridMap(self.x_dim, self.y_dim, dtype=self.base_grid.dtype, grid=self.base_grid.copy())
+        self.planner = planner_class(map=known, s_start=start, s_goal=goal, headless=True, random_obstacles=False, **planner_kwargs)
+        self.slam = SLAM(map=known, view_range=view_range, planner=self.planner) if view_range is not None else None
+        self.path = None
+        self.replan_times = []
+        self.sense_times = []
+        self.moves = 0
+        self.waits = 0
+
+    def reserved(self, cell):
+        return cell == self.position or cell == self.goal
+
+    def sense(self, changes):
+        if self.slam is not None:
+            return len(self.slam.update_map(self.position, self.truth))
+        if changes:
+            self.planner.apply_changes(changes, replan=False)
+        return len(changes)
+
+    def step(self):
+        changes = {}
+        for generator in self.generators:
+            for cell, cost in generator.step(self):
+                changes[cell] = cost
+        for cell, cost in changes.items():
+            self.truth.grid[cell] = cost
+        # Move the planner's start first so the changes are keyed against where the robot is now.
+        # Replan latency includes sensing: apply_changes does the vertex updates and any heuristic refresh.
+        t0 = time.perf_counter()
+        self.planner.s_start = self.position
+        self.sense([(cell, cost) for cell, cost in changes.items()])
+        t1 = time.perf_counter()
+        self.path, _ = self.planner.move_and_replan(self.position)
+        self.sense_times.append(t1 - t0)
+        self.replan_times.append(time.perf_counter() - t0)
+
+        # Wait in place when there is no path or the next cell is taken in the ground truth.
+        path = self.path
+        reachable = path[-1] == self.goal and self.planner.g[self.position] != np.inf
+        if reachable and len(path) > 1 and self.truth.grid[path[1]] != -1:
+            self.position = path[1]
+            self.moves += 1
+        else:
+            self.waits += 1
+        self.tick += 1
+        return self.position
+
+    def run(self, max_ticks=1000):
+        t0 = time.perf_counter()
+        while self.tick < max_ticks and self.position != self.goal:
+            self.step()
+        return self.report(time.perf_counter() - t0)
+
+    def report(self, elapsed):
+        replan_times = np.array(self.replan_times, dtype=float)
+        sense_times = np.array(self.sense_times, dtype=float)
+        stats = self.planner.stats
+        result = {
+            'planner': type(self.planner).__name__,
+            'grid_size': [self.x_dim, self.y_dim],
+            'ticks': self.tick,
+            'reached_goal': self.position == self.goal,
+            'moves': self.moves,
+            'waits': self.waits,
+            'elapsed_time': elapsed,
+            'ticks_per_second': self.tick / elapsed if elapsed > 0 else 0.0,
+            'expansions': stats.expansions,
+            'vertex_updates': stats.vertex_updates,
+        }
+        if len(replan_times):
+            # The first tick includes the initial search, so it is reported separately.
+            result['initial_plan_time'] = float(replan_times[0])
+        replans = replan_times[1:]
+        if len(replans):
+            result.update({
+                'replan_time_min': float(replans.min()),
+                'replan_time_median': float(np.median(replans)),
+                'replan_time_p95': float(np.percentile(replans, 95)),
+                'replan_time_p99': float(np.percentile(replans, 99)),
+                'replan_time_max': float(replans.max()),
+                'sense_time_median': float(np.median(sense_times[1:])),
+                'sense_time_p95': float(np.percentile(sense_times[1:], 95)),
+            })
+        return result
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Closed-loop headless replanning simulation with moving obstacles.")
+    parser.add_argument('--planner', choices=list(PLANNER_CLASSES), default='DStarLite')
+    parser.add_argument('--size', type=int, default=200)
+    parser.add_argument('--density', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ticks', type=int, default=1000, help="stop after this many ticks if the goal is not reached")
+    parser.add_argument('--walkers', type=int, default=20, help="number of random-walk obstacles")
+    parser.add_argument('--doors', type=int, default=0, help="number of randomly placed doors")
+    parser.add_argument('--door-period', type=int, default=20)
+    parser.add_argument('--blockage-interval', type=int, default=0, help="ticks between corridor blockages, 0 disables them")
+    parser.add_argument('--view-range', type=int, default=None, help="sense changes only this close to the robot; default sees all")
+    parser.add_argument('--connectivity', type=int, choices=[4, 8], default=4)
+    parser.add_argument('--heuristic', choices=['auto', 'manhattan', 'octile', 'euclidean', 'zero', 'alt'], default='auto')
+    parser.add_argument('--budget-ms', type=float, default=None, help="replan with AnytimeDStarLite under this per-tick budget")
+    parser.add_argument('--max-expansions', type=int, default=None, help="replan with AnytimeDStarLite under this per-tick expansion budget")
+    parser.add_argument('--epsilon', type=float, default=2.5, help="initial heuristic inflation of the anytime planner")
+    parser.add_argument('--output', default=None, help="optional JSON file for the report")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    truth, start, goal, _ = make_world(args.size, args.density, args.seed)
+    planner_class = PLANNER_CLASSES[args.planner]
+    planner_kwargs = {'connectivity': args.connectivity, 'heuristic': args.heuristic}
+    if args.budget_ms is not None or args.max_expansions is not None:
+        planner_class = AnytimeDStarLite
+        planner_kwargs.update(epsilon=args.epsilon, budget_ms=args.budget_ms, max_expansions=args.max_expansions)
+    sim = Simulation(truth, start, goal, planner_class, view_range=args.view_range, seed=args.seed, **planner_kwargs)
+    if args.walkers:
+        sim.generators.append(RandomWalkers(args.walkers))
+    if args.doors:
+        sim.generators.append(Doors.random(sim, args.doors, period=args.door_period))
+    if args.blockage_interval:
+        sim.generators.append(CorridorBlockages(interval=args.blockage_interval))
+    report = sim.run(args.ticks)
+    print(f"{report['planner']} {args.size}x{args.size}: {report['ticks']} ticks at {report['ticks_per_second']:.1f} ticks/s, "
+          f"goal {'reached' if report['reached_goal'] else 'not reached'}, initial plan {report.get('initial_plan_time', 0.0):.4f}s, "
+          f"replan median {report.get('replan_time_median', 0.0) * 1000:.3f}ms p95 {report.get('replan_time_p95', 0.0) * 1000:.3f}ms "
+          f"max {report.get('replan_time_max', 0.0) * 1000:.3f}ms (sensing median {report.get('sense_time_median', 0.0) * 1000:.3f}ms)",
+          file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report))
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,28 @@
+import numpy as np
+
 class SLAM:
-    def __init__(self, map, view_range):
+    def __init__(self, map, view_range, planner=None):
         self.map = map
         self.view_range = view_range
+        self.planner = planner
+
+    def sense(self, robot_position, ground_truth):
+        x, y = robot_position
+        x0 = max(0, x - self.view_range)
+        x1 = min(self.map.x_dim, x + self.view_range + 1)
+        y0 = max(0, y - self.view_range)
+        y1 = min(self.map.y_dim, y + self.view_range + 1)
+        truth = getattr(ground_truth, 'grid', ground_truth)[x0:x1, y0:y1]
+        known = self.map.grid[x0:x1, y0:y1]
+        xs, ys = np.nonzero(truth != known)
+        return np.column_stack((xs + x0, ys + y0, truth[xs, ys])).astype(float)
 
-    def update_map(self, robot_position):
-        # Dummy implementation for SLAM
-        pass
+    def update_map(self, robot_position, ground_truth):
+        changes = self.sense(robot_position, ground_truth)
+        if len(changes) == 0:
+            return changes
+        if self.planner is not None:
+            self.planner.apply_changes(changes, replan=False)
+        else:
+            self.map.set_costs(changes[:, 0].astype(np.intp), changes[:, 1].astype(np.intp), changes[:, 2])
+        return changes
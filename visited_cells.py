@@ -0,0 +1,38 @@
+import numpy as np
+
+class VisitedCells:
+    def __init__(self, x_dim, y_dim):
+        self.x_dim = x_dim
+        self.y_dim = y_dim
+        self.bits = bytearray((x_dim * y_dim + 7) // 8)
+        self.count = 0
+
+    def append(self, cell):
+        self.add_index(cell[0] * self.y_dim + cell[1])
+
+    def add_index(self, index):
+        byte = self.bits[index >> 3]
+        bit = 1 << (index & 7)
+        if not byte & bit:
+            self.bits[index >> 3] = byte | bit
+            self.count += 1
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, cell):
+        index = cell[0] * self.y_dim + cell[1]
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def __iter__(self):
+        for x, y in np.argwhere(self.mask).tolist():
+            yield (x, y)
+
+    @property
+    def mask(self):
+        bits = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), bitorder='little')
+        return bits[:self.x_dim * self.y_dim].reshape(self.x_dim, self.y_dim).astype(bool)
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0